@@ -1,13 +1,29 @@
 import streamlit as st
-from streamlit_autorefresh import st_autorefresh
+import os
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import perf_spans
+from perf_spans import timed
+from sheet_fetch import shared_fetcher
+from sheet_schema import FORM_SHEET, TRACKING_SHEET
+from snapshot_store import frame_fingerprint, serve_snapshot, snapshot_cache
+from site_frame import compact_sites
+from site_reconcile import reconcile_sites
+from map_layers import map_html, site_map
+from render_cache import cache_key, map_html_cache
+from charts import chart_cache_stats, status_chart_png, trend_chart_png
+from exports import HTML_MIME, XLSX_MIME, excel_export, export_cache, html_export
+from kpi_cube import LiveKpiCube
+from site_filters import SiteFilterIndex
+
+run_started = time.perf_counter()
 
 # --- إعداد الصفحة ---
 st.set_page_config(page_title="ODC-AC Installation Dashboard", layout="wide")
 
-# --- تحديث تلقائي كل 30 ثانية ---
-refresh_interval = 30
-count = st_autorefresh(interval=refresh_interval * 1000, key="auto_refresh")
-
 # --- CSS مخصص لتجميل الواجهة ---
 st.markdown("""
     <style>
@@ -39,131 +55,264 @@ with col2:
 with col3:
     st.image("latis_logo.png", width=100)
 
-# باقي المكتبات
-import pandas as pd
-import folium
-from streamlit_folium import folium_static
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
-from datetime import datetime
-from zoneinfo import ZoneInfo
+SHEET_URL = os.environ.get("ODC_SITES_CSV_URL", "https://docs.google.com/spreadsheets/d/1pZBg_lf8HakI6o2W1v8u1lUN2FGJn1Jc/export?format=csv&gid=622694975")
+FORM_URL = os.environ.get("ODC_FORM_CSV_URL", "https://docs.google.com/spreadsheets/d/1GClN4fCfP8aAUoUO3ayHOdUP6eiuL1wmrSaxiR4CxK8/edit?gid=1294784605#gid=1294784605")
 
 # --- تحميل البيانات ---
-@st.cache_data(ttl=30)
-def load_data():
-    try:
-        sheet_url = "https://docs.google.com/spreadsheets/d/1pZBg_lf8HakI6o2W1v8u1lUN2FGJn1Jc/export?format=csv&gid=622694975"
-        form_url = "https://docs.google.com/spreadsheets/d/1GClN4fCfP8aAUoUO3ayHOdUP6eiuL1wmrSaxiR4CxK8/edit?gid=1294784605#gid=1294784605"
-        df_sites = pd.read_csv(sheet_url)
-        df_form = pd.read_csv(form_url)
-    except:
-        return pd.DataFrame()
-
-    df_sites.columns = df_sites.columns.str.strip()
-    df_form.columns = df_form.columns.str.strip()
-    if "Site ID" not in df_sites.columns or "Site ID" not in df_form.columns:
-        return pd.DataFrame()
-
-    df_sites["Site ID"] = df_sites["Site ID"].astype(str).str.strip().str.upper()
-    df_form["Site ID"] = df_form["Site ID"].astype(str).str.strip().str.upper()
-    df_merged = df_sites.merge(df_form[["Site ID", "Latitude", "Longitude", "Timestamp"]],
-                               on="Site ID", how="left", suffixes=("", "_form"))
-    df_merged["Status"] = df_merged["Timestamp"].apply(lambda x: "Installed" if pd.notnull(x) else "Open")
-    df_merged["Latitude"] = df_merged["Latitude"].fillna(df_merged["Latitude_form"])
-    df_merged["Longitude"] = df_merged["Longitude"].fillna(df_merged["Longitude_form"])
-    df_merged["Installation Date"] = pd.to_datetime(df_merged["Timestamp"], errors="coerce")
-    df_merged["Latitude"] = pd.to_numeric(df_merged["Latitude"], errors="coerce")
-    df_merged["Longitude"] = pd.to_numeric(df_merged["Longitude"], errors="coerce")
+# Two tiers: the Tracking Sheet (site list, regions, planned coordinates) rarely
+# changes and is refetched every SITES_TTL; the form sheet is refetched every
+# FORM_TTL. When only the form changed, only the join below reruns.
+SITES_TTL = int(os.environ.get("ODC_SITES_TTL", 6 * 3600))
+FORM_TTL = int(os.environ.get("ODC_FORM_TTL", 30))
+# The stale-data banner shows once the data has not been confirmed for this long.
+STALE_AFTER = int(os.environ.get("ODC_STALE_AFTER", 3 * FORM_TTL))
+
+SCHEMAS = {"sites": TRACKING_SHEET, "form": FORM_SHEET}
+
+# Keyed on the payload digest only, so an unchanged sheet is not parsed again.
+# Only the schema's columns are parsed, already typed; a missing Site ID
+# column raises SchemaError, so a bad payload is never cached for a whole TTL.
+@st.cache_data(max_entries=4)
+def parse_sheet(digest, sheet, _raw):
+    df = SCHEMAS[sheet].read(_raw)
+    df.attrs["source_fingerprint"] = digest
+    return df
+
+@st.cache_data(ttl=SITES_TTL)
+def load_site_master():
+    sites = shared_fetcher().fetch(SHEET_URL)
+    return parse_sheet(sites.digest, "sites", sites.content)
+
+@st.cache_data(ttl=FORM_TTL)
+def load_form():
+    form = shared_fetcher().fetch(FORM_URL)
+    return parse_sheet(form.digest, "form", form.content)
+
+# Shared, not copied: every caller gets the same compact frame (see site_frame).
+@st.cache_resource(max_entries=2)
+def merge_sheets(sites_digest, form_digest, _df_sites, _df_form):
+    df_merged = reconcile_sites(_df_sites, _df_form)
     df_merged.dropna(subset=["Latitude", "Longitude"], inplace=True)
-    return df_merged
+    df_merged.attrs["source_fingerprint"] = f"{sites_digest}:{form_digest}"
+    return compact_sites(df_merged)
+
+# Errors propagate: the snapshot cache records them, backs off and keeps
+# serving the last good data instead of an empty frame.
+def load_data():
+    # On a cold start, or when both TTLs ran out together, the two downloads
+    # overlap; with the site list still cached the worker returns at once.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending_sites = pool.submit(load_site_master)
+        df_form = load_form()
+        df_sites = pending_sites.result()
+    return merge_sheets(df_sites.attrs["source_fingerprint"], df_form.attrs["source_fingerprint"], df_sites, df_form)
+
+@st.cache_resource
+def get_live_cube(_feed):
+    return LiveKpiCube(_feed)
+
+@st.cache_resource(max_entries=2)
+def get_filter_index(fingerprint, _df):
+    return SiteFilterIndex(_df)
 
-df = load_data()
-if df.empty:
-    st.error("⚠️ No data loaded. Please check the Google Sheets links.")
+# --- تحديث تلقائي كل 30 ثانية ---
+# One background thread per process polls the sheets and publishes versioned
+# snapshots. The header, sidebar and export buttons below render only on full
+# runs; the KPI strip, map, charts and footer are fragments that rerun on their
+# own every refresh_interval and read whatever snapshot is current.
+SNAPSHOT = "odc_ac_dashboard"
+refresh_interval = FORM_TTL
+
+def live_view(filters):
+    """Latest snapshot, its fingerprint and the row selection for ``filters``."""
+    df = serve_snapshot(SNAPSHOT, load_data, refresh_every=refresh_interval)
+    fingerprint = frame_fingerprint(df)
+    # الصفوف تُبنى مرة واحدة عند أول استخدام (الخريطة والتصدير فقط)
+    return df, fingerprint, get_filter_index(fingerprint, df).select(**filters)
+
+def fresh_installs(df):
+    """Sites installed since this session's previous snapshot version.
+
+    Diffed once per process when the snapshot changed; kept for this session
+    until the next version so filter changes don't drop the highlight.
+    """
+    version = df.attrs["snapshot_version"]
+    seen = st.session_state.get("seen_changes")
+    if seen is None or seen["version"] != version:
+        changes = snapshot_cache(SNAPSHOT, load_data).changes.since(seen["version"], version) if seen else None
+        fresh = changes.newly_installed.reset_index() if changes is not None else df.iloc[:0]
+        seen = st.session_state["seen_changes"] = {"version": version, "fresh": fresh}
+        if len(fresh):
+            st.toast(f"✅ {len(fresh)} site(s) installed since last refresh")
+    return seen["fresh"]
+
+def format_age(seconds):
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 2 * 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 2 * 86400:
+        return f"{seconds / 3600:.0f} h"
+    return f"{seconds / 86400:.0f} days"
+
+# --- حالة البيانات: تُعرض آخر بيانات سليمة فوراً ويُحدَّث في الخلفية ---
+@st.fragment(run_every=refresh_interval)
+def data_status():
+    cache = snapshot_cache(SNAPSHOT, load_data)
+    age = cache.age()
+    if age is None or age < STALE_AFTER:
+        return
+    retry = cache.next_poll_in()
+    reason = f" Last attempt failed: {cache.last_error}." if cache.last_error else ""
+    st.warning(f"⚠️ Showing data last confirmed {format_age(age)} ago; Google Sheets could not be refreshed."
+               f"{reason} Retrying in {round(retry or 0)}s.")
+
+data_status()
+
+df = serve_snapshot(SNAPSHOT, load_data, refresh_every=refresh_interval)
+if df is None or df.empty:
+    # No snapshot at all yet: wait for the background load instead of blocking the run.
+    @st.fragment(run_every=2)
+    def waiting_for_data():
+        cache = snapshot_cache(SNAPSHOT, load_data)
+        if cache.snapshot() is not None:
+            st.rerun()
+        if cache.last_error:
+            st.error(f"⚠️ No data loaded. Please check the Google Sheets links. ({cache.last_error}; "
+                     f"retrying in {round(cache.next_poll_in() or 0)}s)")
+        else:
+            st.info("⏳ Loading data from Google Sheets…")
+
+    waiting_for_data()
     st.stop()
 
 # --- Sidebar Filters ---
 st.sidebar.header("🔍 Filter Options")
+if st.sidebar.button("🔄 Reload site list"):
+    load_site_master.clear()
+    try:
+        snapshot_cache(SNAPSHOT, load_data).refresh()
+    except Exception as e:
+        st.sidebar.error(f"Reload failed; still showing the last good data. ({e})")
+    df = serve_snapshot(SNAPSHOT, load_data)
 regions = df["Region"].dropna().unique().tolist() if "Region" in df.columns else []
 status_filter = st.sidebar.multiselect("Select Status", ["Installed", "Open"], default=["Installed", "Open"])
 region_filter = st.sidebar.multiselect("Select Region", regions, default=regions)
 date_range = st.sidebar.date_input("Installation Date Range", [])
+filters = dict(statuses=status_filter, regions=region_filter, date_range=date_range)
 
-filtered_df = df[df["Status"].isin(status_filter)]
-if region_filter:
-    filtered_df = filtered_df[filtered_df["Region"].isin(region_filter)]
-if date_range and len(date_range) == 2:
-    filtered_df = filtered_df[
-        filtered_df["Installation Date"].between(pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1]))
-    ]
-
-# --- KPIs ---
-total_sites = len(filtered_df)
-installed_count = (filtered_df["Status"] == "Installed").sum()
-open_count = (filtered_df["Status"] == "Open").sum()
-progress = round((installed_count / total_sites) * 100, 2) if total_sites else 0
-installed_dates = pd.to_datetime(filtered_df[filtered_df["Status"] == "Installed"]["Installation Date"], errors="coerce")
-days_span = (installed_dates.max() - installed_dates.min()).days or 1 if not installed_dates.empty else 1
-daily_rate = round(installed_count / days_span, 2) if days_span else 0
-
-k1, k2, k3, k4, k5 = st.columns(5)
-k1.metric("📍 Total Sites", total_sites)
-k2.metric("✅ Installed", installed_count)
-k3.metric("❌ Open", open_count)
-k4.metric("📊 Progress %", f"{progress}%")
-k5.metric("📈 Daily Rate", f"{daily_rate} sites/day")
+# --- KPIs (من مكعب التجميع بدلاً من إعادة فحص الصفوف) ---
+@st.fragment(run_every=refresh_interval)
+@timed("fragment.kpis")
+def kpi_strip(filters):
+    df, _, _ = live_view(filters)
+    fresh_installs(df)
+    feed = snapshot_cache(SNAPSHOT, load_data).changes
+    kpis = get_live_cube(feed).get(df, df.attrs["snapshot_version"]).kpis(**filters)
+    k1, k2, k3, k4, k5 = st.columns(5)
+    k1.metric("📍 Total Sites", kpis.total_sites)
+    k2.metric("✅ Installed", kpis.installed_count)
+    k3.metric("❌ Open", kpis.open_count)
+    k4.metric("📊 Progress %", f"{kpis.progress}%")
+    k5.metric("📈 Daily Rate", f"{kpis.daily_rate} sites/day")
+
+kpi_strip(filters)
 
 # --- Map ---
-st.subheader("📍 Site Installation Map")
-m = folium.Map(location=[23.8859, 45.0792], zoom_start=6)
-for _, row in filtered_df.iterrows():
-    color = "green" if row["Status"] == "Installed" else "red"
-    popup = f"Site ID: {row['Site ID']}<br>Status: {row['Status']}<br>Date: {row.get('Installation Date', 'N/A')}<br>Region: {row.get('Region', 'N/A')}"
-    folium.CircleMarker(location=[row["Latitude"], row["Longitude"]], radius=6, popup=popup,
-                        color=color, fill=True, fill_color=color, fill_opacity=0.8).add_to(m)
-folium_static(m)
+@st.fragment(run_every=refresh_interval)
+@timed("fragment.map")
+def map_section(filters):
+    df, fingerprint, selection = live_view(filters)
+    fresh = fresh_installs(df)
+    st.subheader("📍 Site Installation Map")
+    # الخريطة تُعاد من الذاكرة ما لم تتغير البيانات أو الفلاتر
+    highlight = fresh[fresh["Site ID"].isin(selection.frame["Site ID"])] if len(fresh) else fresh
+    map_key = cache_key(fingerprint, filters, width=700, height=500, highlight=tuple(highlight["Site ID"]))
+    map_doc = map_html_cache().get_or_render(map_key, lambda: map_html(site_map(selection.frame, highlight=highlight)))
+    if len(highlight):
+        st.caption(f"🟡 {len(highlight)} site(s) installed since last refresh are ringed on the map.")
+    st.iframe(map_doc, height=510, width=700)
+
+map_section(filters)
 
 # --- Charts ---
-st.subheader("📊 Status Distribution")
-chart_type = st.radio("Chart Type", ["Pie", "Bar"], horizontal=True)
-status_counts = filtered_df["Status"].value_counts()
-fig, ax = plt.subplots()
-if chart_type == "Pie":
-    status_counts.plot.pie(autopct="%1.1f%%", colors=["green", "red"], ax=ax)
-    ax.set_ylabel("")
-else:
-    status_counts.plot.bar(color=["green", "red"], ax=ax)
-    ax.set_ylabel("Site Count")
-st.pyplot(fig)
-
-# --- Trend Chart ---
-st.subheader("📈 Installation Trend")
-trend = filtered_df[filtered_df["Status"] == "Installed"]
-trend = trend.groupby(trend["Installation Date"].dt.date).size()
-fig2, ax2 = plt.subplots()
-trend.plot(ax=ax2)
-ax2.set_ylabel("Installed Sites")
-ax2.set_xlabel("Date")
-st.pyplot(fig2)
+@st.fragment(run_every=refresh_interval)
+@timed("fragment.charts")
+def chart_section(filters):
+    df, _, _ = live_view(filters)
+    cube = get_live_cube(snapshot_cache(SNAPSHOT, load_data).changes).get(df, df.attrs["snapshot_version"])
+    st.subheader("📊 Status Distribution")
+    chart_type = st.radio("Chart Type", ["Pie", "Bar"], horizontal=True)
+    st.image(status_chart_png(cube.status_counts(**filters), chart_type), width="stretch")
+
+    # --- Trend Chart ---
+    st.subheader("📈 Installation Trend")
+    st.image(trend_chart_png(cube.daily_installs(**filters), ylabel="Installed Sites"), width="stretch")
+
+chart_section(filters)
 
 # --- Export ---
 st.markdown("### 📥 Export Options")
-excel_buffer = BytesIO()
-filtered_df.to_excel(excel_buffer, index=False)
-st.download_button("⬇️ Download Excel", data=excel_buffer.getvalue(), file_name="installation_status.xlsx",
-                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+# الملف يُبنى فقط عند الضغط على الزر ويُشارك بين المستخدمين بنفس الفلاتر
+# The buttons are static; the snapshot is resolved when the file is requested.
+def export_file(export):
+    _, fingerprint, selection = live_view(filters)
+    return export(cache_key(fingerprint, filters), lambda: selection.frame)()
+
+st.download_button("⬇️ Download Excel", data=lambda: export_file(excel_export),
+                   file_name="installation_status.xlsx", mime=XLSX_MIME, on_click="ignore")
 
-html_table = filtered_df[["Site ID", "Status", "Installation Date"]].to_html(index=False)
-pdf_html = f"<html><body>{html_table}</body></html>"
-b64 = base64.b64encode(pdf_html.encode()).decode()
-st.markdown(f'<a href="data:text/html;base64,{b64}" download="installation_report.html">⬇️ Download PDF Report</a>', unsafe_allow_html=True)
+st.download_button("⬇️ Download PDF Report", data=lambda: export_file(html_export),
+                   file_name="installation_report.html", mime=HTML_MIME, on_click="ignore")
 
 # --- Footer ---
-ksa_time = datetime.now(ZoneInfo("Asia/Riyadh"))
 st.markdown("---")
-st.markdown(f"<p style='text-align:center;'>⏰ Last Update: {ksa_time.strftime('%H:%M:%S')} | Refresh every {refresh_interval}s</p>", unsafe_allow_html=True)
 
-remaining = refresh_interval - (count % refresh_interval)
-color = "red" if remaining <= 10 else "black"
-st.markdown(f"<p style='text-align:center; font-size:18px; color:{color};'>⏳ Refreshing in: {remaining} seconds</p>", unsafe_allow_html=True)
+# The seconds tick in the browser; the server only re-seeds the countdown once per refresh.
+COUNTDOWN_HTML = """
+<p id="countdown" style="text-align:center; font-family:sans-serif; font-size:18px; margin:0;"></p>
+<script>
+let left = %d;
+const label = document.getElementById("countdown");
+function tick() {
+    label.style.color = left <= 10 ? "red" : "black";
+    label.textContent = left > 0 ? `⏳ Refreshing in: ${left} seconds` : "⏳ Refreshing…";
+    left -= 1;
+}
+tick();
+setInterval(tick, 1000);
+</script>
+"""
+
+@st.fragment(run_every=refresh_interval)
+def footer():
+    published = snapshot_cache(SNAPSHOT, load_data).snapshot()
+    ksa_time = datetime.fromtimestamp(published.saved_at, ZoneInfo("Asia/Riyadh")) if published else datetime.now(ZoneInfo("Asia/Riyadh"))
+    st.markdown(f"<p style='text-align:center;'>⏰ Last Update: {ksa_time.strftime('%H:%M:%S')} | Refresh every {refresh_interval}s</p>", unsafe_allow_html=True)
+    remaining = snapshot_cache(SNAPSHOT, load_data).next_poll_in()
+    remaining = round(remaining) if remaining is not None else refresh_interval
+    st.iframe(COUNTDOWN_HTML % remaining, height=32)
+
+footer()
+
+# --- Timing (hidden: add ?debug=1 to the URL) ---
+# Spans and cache counters are also written to .metrics/spans.json and
+# spans.prom every minute for scraping.
+perf_spans.registry.register_stats("map_html_cache", map_html_cache().stats)
+perf_spans.registry.register_stats("chart_cache", chart_cache_stats)
+perf_spans.registry.register_stats("export_cache", export_cache().stats)
+perf_spans.registry.dump_every(60)
+perf_spans.registry.record("page.run", time.perf_counter() - run_started, rows=len(df))
+
+if st.query_params.get("debug") == "1":
+    with st.expander("🛠 Timing", expanded=True):
+        metrics = perf_spans.registry.snapshot()
+        spans = pd.DataFrame.from_dict(metrics["spans"], orient="index")
+        if not spans.empty:
+            timing_columns = ["last_seconds", "p50_seconds", "p90_seconds", "p99_seconds", "max_seconds"]
+            spans[timing_columns] = spans[timing_columns] * 1000
+            spans = spans.rename(columns={col: col.replace("_seconds", " ms") for col in timing_columns})
+            st.dataframe(spans.drop(columns="total_seconds").round(1), width="stretch")
+        st.dataframe(pd.DataFrame(metrics["stats"]).T, width="stretch")
+        if st.button("Write metrics dump"):
+            st.caption(f"Written to {perf_spans.registry.dump()}/spans.json and spans.prom")
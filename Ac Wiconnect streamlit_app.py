@@ -1,50 +1,46 @@
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import folium
 from streamlit_folium import st_folium
 from datetime import datetime
-from io import BytesIO
-import base64
+from sheet_fetch import read_sheets
+from snapshot_store import frame_fingerprint, serve_snapshot
+from site_frame import compact_sites
+from site_reconcile import reconcile_sites, site_ids
+from map_layers import site_map
+from exports import XLSX_MIME, excel_export
 
 # Title
 st.set_page_config(layout="wide")
 st.title("📊 Saudi AC Installation Dashboard")
 
 # Load data
-@st.cache_data(ttl=86400)
+@st.cache_resource(ttl=86400)
 def load_data():
     # Project Progress sheet only
     form_url = "https://docs.google.com/spreadsheets/d/1IeZVNb01-AMRuXjj9SZQyELTVr6iw5Vq4JsiN7PdZEs/gviz/tq?tqx=out:csv&sheet=Project Progress"
     project_url = "https://docs.google.com/spreadsheets/d/1pZBg_lf8HakI6o2W1v8u1lUN2FGJn1Jc/export?format=csv&gid=622694975"
 
-    df_installed = pd.read_csv(form_url)
-df_installed = df_installed.copy()
-df_installed.columns = df_installed.columns.str.strip()
-df_installed = df_installed.loc[:, ~df_installed.columns.duplicated()].copy()
-    df_sites = pd.read_csv(project_url)
-df_sites = df_sites.copy()
-df_sites.columns = df_sites.columns.str.strip()
-df_sites = df_sites.loc[:, ~df_sites.columns.duplicated()].copy()
-
-    df_sites.columns = df_sites.columns.str.strip()
+    df_installed, df_sites = read_sheets(form_url, project_url)
     df_installed.columns = df_installed.columns.str.strip()
+    df_installed = df_installed.loc[:, ~df_installed.columns.duplicated()].copy()
+    df_sites.columns = df_sites.columns.str.strip()
+    df_sites = df_sites.loc[:, ~df_sites.columns.duplicated()].copy()
 
-    df_sites["Site ID"] = df_sites["Site ID"].astype(str).str.strip().str.upper()
-    df_installed["Site ID"] = df_installed["Site ID"].astype(str).str.strip().str.upper()
+    df_sites["Site ID"] = site_ids(df_sites["Site ID"])
+    df_installed["Site ID"] = site_ids(df_installed["Site ID"])
 
-    df = pd.merge(df_sites, df_installed[["Site ID", "Latitude", "Longitude", "Timestamp"]], on="Site ID", how="left")
+    df = reconcile_sites(df_sites, df_installed[["Site ID", "Latitude", "Longitude", "Timestamp"]], status_column=None)
 
     df["Scope Status"] = df["Scope Status"].str.strip().str.lower()
-    df["Installation Status"] = df["Count Of Installed ACs"].apply(lambda x: "INSTALLED" if x >= 1 else "open")
+    installed_acs = pd.to_numeric(df["Count Of Installed ACs"], errors="coerce")
+    df["Installation Status"] = np.where(installed_acs >= 1, "INSTALLED", "open")
 
-    df["Latitude"] = pd.to_numeric(df["Latitude"], errors="coerce")
-    df["Longitude"] = pd.to_numeric(df["Longitude"], errors="coerce")
+    df["Installation Date"] = df["Installation Date"].dt.date
+    return compact_sites(df)
 
-    df["Installation Date"] = pd.to_datetime(df["Timestamp"], errors="coerce").dt.date
-    return df
-
-df = load_data()
+df = serve_snapshot("ac_wiconnect_streamlit_app", load_data)
 
 # KPIs
 total_sites = len(df)
@@ -67,22 +63,14 @@ kpi5.metric("Daily Rate", f"{daily_rate} sites/day")
 # Map
 st.subheader("📍 Site Installation Map")
 
-def get_color(scope_status, install_status):
-    if str(scope_status).lower() == "open":
-        return "red"
-    elif str(install_status).strip().upper() == "INSTALLED":
-        return "green"
-    return "gray"
-
-m = folium.Map(location=[23.8859, 45.0792], zoom_start=6)
+def get_colors(df):
+    colors = pd.Series("gray", index=df.index)
+    colors[df["Installation Status"].astype(str).str.strip().str.upper() == "INSTALLED"] = "green"
+    colors[df["Scope Status"].astype(str).str.lower() == "open"] = "red"
+    return colors
 
-for _, row in df.iterrows():
-    if "Latitude" in row and "Longitude" in row and pd.notna(row["Latitude"]) and pd.notna(row["Longitude"]):
-        folium.Marker(
-            location=[row["Latitude"], row["Longitude"]],
-            popup=f'Site ID: {row["Site ID"]} | Status: {row["Installation Status"]}',
-            icon=folium.Icon(color=get_color(row["Scope Status"], row["Installation Status"]))
-        ).add_to(m)
+m = site_map(df.assign(**{"Map Color": get_colors(df)}), status_column="Installation Status",
+             fields=["Site ID", "Installation Status"], color_column="Map Color")
 
 st_data = st_folium(m, width=1100, height=500)
 
@@ -97,9 +85,5 @@ st.line_chart(trend)
 
 # Download buttons
 st.subheader("📥 Export Data")
-excel_buffer = BytesIO()
-df.to_excel(excel_buffer, index=False, engine='openpyxl')
-excel_data = excel_buffer.getvalue()
-b64 = base64.b64encode(excel_data).decode()
-href = f'<a href="data:application/octet-stream;base64,{b64}" download="Saudi_AC_Installation_Progress.xlsx">📥 Download Excel File</a>'
-st.markdown(href, unsafe_allow_html=True)
+st.download_button("📥 Download Excel File", data=excel_export(frame_fingerprint(df), df),
+                   file_name="Saudi_AC_Installation_Progress.xlsx", mime=XLSX_MIME, on_click="ignore")
@@ -1,40 +1,39 @@
 import streamlit as st
-import pandas as pd
-import folium
 from streamlit_folium import st_folium
-from io import BytesIO
 from datetime import datetime
-import matplotlib.pyplot as plt
+from sheet_fetch import read_sheets
+from snapshot_store import frame_fingerprint, serve_snapshot
+from site_frame import compact_sites
+from site_reconcile import reconcile_sites, site_ids
+from map_layers import site_map
+from charts import trend_chart_png
+from exports import XLSX_MIME, excel_export
+from report_jobs import ReportInput, region_table, report_jobs
 
 # Title
 st.set_page_config(page_title="Saudi AC Installation Dashboard", layout="wide")
 st.title("📊 Saudi AC Installation Dashboard")
 
 # Load Google Sheet
-@st.cache_data
+@st.cache_resource
 def load_data():
     url_sites = "https://docs.google.com/spreadsheets/d/1pZBg_lf8HakI6o2W1v8u1lUN2FGJn1Jc/export?format=csv&gid=622694975"
     url_installed = "https://docs.google.com/spreadsheets/d/1IeZVNb01-AMRuXjj9SZQyELTVr6iw5Vq4JsiN7PdZEs/export?format=csv&gid=1076079545"
-    df_sites = pd.read_csv(url_sites)
-    df_installed = pd.read_csv(url_installed)
+    df_sites, df_installed = read_sheets(url_sites, url_installed)
 
     df_sites.columns = df_sites.columns.str.strip()
     df_installed.columns = df_installed.columns.str.strip()
 
-    df_sites["Site ID"] = df_sites["Site ID"].astype(str).str.strip().str.upper()
-    df_installed["Site ID"] = df_installed["Site ID"].astype(str).str.strip().str.upper()
+    df_sites["Site ID"] = site_ids(df_sites["Site ID"])
+    df_installed["Site ID"] = site_ids(df_installed["Site ID"])
 
-    df = df_sites.merge(df_installed[["Site ID", "Installation Date"]], on="Site ID", how="left")
+    df = reconcile_sites(df_sites, df_installed[["Site ID", "Installation Date"]], time_column="Installation Date")
     df["Scope Status"] = df["Scope Status"].fillna("Open")
-    df["Installation Date"] = pd.to_datetime(df["Installation Date"], errors="coerce")
-    df["Status"] = df["Installation Date"].notna().map({True: "Installed", False: "Open"})
-    df["Latitude"] = pd.to_numeric(df["Latitude"], errors="coerce")
-    df["Longitude"] = pd.to_numeric(df["Longitude"], errors="coerce")
     df.dropna(subset=["Latitude", "Longitude"], inplace=True)
 
-    return df
+    return compact_sites(df)
 
-df = load_data()
+df = serve_snapshot("wiconnect_ac_project_p2", load_data)
 
 # KPIs
 total_sites = len(df)
@@ -52,39 +51,53 @@ col5.metric("Daily Rate", f"{daily_rate} sites/day")
 
 # Map
 st.subheader("📍 Site Installation Map")
-def get_color(status):
-    return "green" if status == "Installed" else "red"
-
-m = folium.Map(location=[23.8859, 45.0792], zoom_start=6)
-for _, row in df.iterrows():
-    folium.CircleMarker(
-        location=[row["Latitude"], row["Longitude"]],
-        radius=6,
-        color=get_color(row["Status"]),
-        fill=True,
-        fill_opacity=0.7,
-        popup=f"{row['Site ID']} - {row['Status']}"
-    ).add_to(m)
+m = site_map(df, fields=["Site ID", "Status"], fill_opacity=0.7)
 st_folium(m, width=1100)
 
 # Chart
 st.subheader("📈 Daily Installation Trend")
 installed_df = df[df["Status"] == "Installed"]
 daily_installs = installed_df["Installation Date"].value_counts().sort_index()
-fig, ax = plt.subplots()
-daily_installs.plot(kind="bar", ax=ax)
-ax.set_xlabel("Date")
-ax.set_ylabel("Sites Installed")
-st.pyplot(fig)
+st.image(trend_chart_png(daily_installs, ylabel="Sites Installed", kind="bar"), width="stretch")
 
 # Download buttons
 st.subheader("📥 Export Data")
-buffer = BytesIO()
-df.to_excel(buffer, index=False, engine="openpyxl")
-st.download_button("Download Excel", buffer.getvalue(), file_name="installation_progress.xlsx", mime="application/vnd.ms-excel")
-
-from xhtml2pdf import pisa
-html_content = f"<h1>Installation Report</h1><p>Total Sites: {total_sites}, Installed: {installed_sites}, Open: {open_sites}, Progress: {progress}%</p>"
-pdf = BytesIO()
-pisa.CreatePDF(src=html_content, dest=pdf)
-st.download_button("Download PDF", pdf.getvalue(), file_name="installation_report.pdf", mime="application/pdf")
\ No newline at end of file
+st.download_button("Download Excel", excel_export(frame_fingerprint(df), df), file_name="installation_progress.xlsx", mime=XLSX_MIME, on_click="ignore")
+
+# PDF report, rendered off the script run in a worker process
+st.subheader("📄 PDF Report")
+report_key = frame_fingerprint(df)
+jobs = report_jobs()
+
+def report_input():
+    return ReportInput(
+        title="Installation Report",
+        summary=(("Total Sites", total_sites), ("Installed", installed_sites), ("Open", open_sites),
+                 ("Progress %", f"{progress}%"), ("Daily Rate", f"{daily_rate} sites/day"),
+                 ("Generated", datetime.now().strftime("%Y-%m-%d %H:%M"))),
+        regions=region_table(df),
+        region_columns=("Region", "Sites", "Installed", "Open", "Progress %"),
+        trend_png=trend_chart_png(daily_installs, ylabel="Sites Installed", kind="bar"),
+    )
+
+def report_panel(polling):
+    status = jobs.status(report_key)
+    if status == "missing":
+        if st.button("Prepare PDF report"):
+            jobs.submit(report_key, report_input())
+            st.rerun()
+    elif status == "running":
+        st.info("⏳ Building the PDF report in the background…")
+    elif status == "failed":
+        st.error(f"PDF report failed: {jobs.get(report_key).exception()}")
+        if st.button("Retry PDF report"):
+            jobs.submit(report_key, report_input())
+            st.rerun()
+    else:
+        if polling:
+            # Finished while polling: rerun the page once to stop the poll.
+            st.rerun()
+        st.download_button("Download PDF", jobs.get(report_key).result(), file_name="installation_report.pdf", mime="application/pdf", on_click="ignore")
+
+running = jobs.status(report_key) == "running"
+st.fragment(report_panel, run_every=2 if running else None)(running)
@@ -0,0 +1,91 @@
+"""Benchmark: sequential pd.read_csv(url) vs concurrent pooled read_sheets().
+
+Starts a local HTTP server that answers every request after a fixed delay and
+serves two CSV "sheets" of different sizes, then times cold loads both ways.
+
+    python bench_fetch.py --delay 0.5 --rounds 5
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from sheet_fetch import SheetFetcher, read_sheets
+
+
+def make_csv(rows):
+    lines = ["Site ID,Region,Latitude,Longitude,Timestamp"]
+    for i in range(rows):
+        lines.append(f"RIY{i:05d},Central,{24 + i % 500 / 1000:.5f},{46 + i % 700 / 1000:.5f},2025-03-01 10:00:00")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def start_server(delay, payloads):
+    class SlowHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(delay)
+            body = payloads.get(self.path.split("?")[0])
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def time_it(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"median_s": round(statistics.median(samples), 4), "min_s": round(min(samples), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.5, help="server delay per request, seconds")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    server = start_server(args.delay, {"/sites.csv": make_csv(args.rows), "/form.csv": make_csv(args.rows // 2)})
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/sites.csv", f"{base}/form.csv"]
+
+    def sequential():
+        return [pd.read_csv(url) for url in urls]
+
+    def concurrent():
+        # A fresh fetcher each round so nothing is served from the revalidation memo.
+        return read_sheets(*urls, fetcher=SheetFetcher())
+
+    results = {
+        "delay_s": args.delay,
+        "rows": args.rows,
+        "sequential": time_it(sequential, args.rounds),
+        "concurrent": time_it(concurrent, args.rounds),
+    }
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Import-time report for the dashboard entry points.
+
+Runs each script's module-level import statements in a fresh interpreter under
+``python -X importtime`` and reports the total, the slowest top-level packages
+and which of the deferred heavy dependencies got loaded anyway, so a regression
+in worker cold start is visible before it ships.
+
+    python bench_imports.py
+    python bench_imports.py --budget-ms 2500 "3 Wiconnect odc_ac_dashboard_corrected_urls_final.py"
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Loaded on first use only; a page render that does not need them should not import them.
+DEFERRED = ("matplotlib", "openpyxl", "xhtml2pdf", "folium")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def dashboard_scripts():
+    scripts = []
+    for path in sorted(glob.glob(os.path.join(HERE, "*.py"))):
+        if "import streamlit as st" in script_imports(path):
+            scripts.append(os.path.basename(path))
+    return scripts
+
+
+def script_imports(path):
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def parse_importtime(stderr):
+    """(name, cumulative µs) for each top-level import in ``-X importtime`` output."""
+    top = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            top.append((name.strip(), int(cumulative)))
+    return top
+
+
+def measure(script, top_n=5):
+    code = "\n".join(script_imports(os.path.join(HERE, script)))
+    code += f"\nimport sys\nprint(','.join(m for m in {DEFERRED!r} if m in sys.modules))"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=HERE, capture_output=True,
+                            text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        return {"script": script, "error": result.stderr.strip().splitlines()[-1]}
+    top = parse_importtime(result.stderr)
+    slowest = sorted(top, key=lambda item: item[1], reverse=True)[:top_n]
+    return {
+        "script": script,
+        "imports_ms": round(sum(us for _, us in top) / 1000, 1),
+        "wall_ms": round(wall * 1000, 1),
+        "slowest": [[name, round(us / 1000, 1)] for name, us in slowest],
+        "deferred_loaded": [name for name in result.stdout.strip().split(",") if name],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scripts", nargs="*", help="dashboard scripts (default: every streamlit script here)")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="exit non-zero if any script's imports take longer than this")
+    args = parser.parse_args()
+
+    over_budget = False
+    for script in args.scripts or dashboard_scripts():
+        row = measure(script)
+        if args.budget_ms is not None and row.get("imports_ms", 0) > args.budget_ms:
+            row["over_budget"] = True
+            over_budget = True
+        print(json.dumps(row, ensure_ascii=False), flush=True)
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
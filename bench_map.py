@@ -0,0 +1,56 @@
+"""Benchmark: per-row CircleMarker loop vs the single GeoJSON site layer.
+
+Reports map build+serialize time and HTML payload size per site count.
+
+    python bench_map.py --sizes 1000 10000 50000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from map_layers import legacy_marker_map, map_html, site_map
+
+
+def make_sites(n, seed=0):
+    rng = np.random.default_rng(seed)
+    installed = rng.random(n) < 0.6
+    dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 120, n), unit="D")
+    return pd.DataFrame({
+        "Site ID": [f"ODC{i:06d}" for i in range(n)],
+        "Region": rng.choice(["Central", "Eastern", "Western", "Northern", "Southern"], n),
+        "Status": np.where(installed, "Installed", "Open"),
+        "Installation Date": pd.Series(dates).where(installed),
+        "Latitude": rng.uniform(16.5, 31.5, n),
+        "Longitude": rng.uniform(36.5, 55.5, n),
+    })
+
+
+def measure(build, df):
+    start = time.perf_counter()
+    html = map_html(build(df))
+    return {"seconds": round(time.perf_counter() - start, 3), "html_bytes": len(html.encode())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--skip-legacy-above", type=int, default=None,
+                        help="only time the GeoJSON layer for sizes above this")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        df = make_sites(n)
+        row = {"sites": n, "geojson_layer": measure(site_map, df)}
+        if args.skip_legacy_above is None or n <= args.skip_legacy_above:
+            row["marker_loop"] = measure(legacy_marker_map, df)
+            row["speedup"] = round(row["marker_loop"]["seconds"] / max(row["geojson_layer"]["seconds"], 1e-9), 1)
+        results.append(row)
+        print(json.dumps(row), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark: the whole dashboard pipeline on synthetic sheets, fully offline.
+
+Generates a Tracking Sheet and a form sheet per size with ``synthetic_sheets``
+and times each stage the final dashboard runs on a refresh: schema-driven CSV
+ingestion (``sheet_schema``), the sites/form reconcile, the KPI cube, the map
+(build + HTML), both charts and the Excel export. Each stage runs ``--repeat`` times and the fastest run is kept.
+Results are JSON lines; ``--output`` also writes them with the environment to
+one file, and ``--baseline`` adds the ratio to an earlier such file per stage.
+
+    python bench_pipeline.py --sizes 1000 10000 100000 --output bench.json
+    python bench_pipeline.py --baseline bench.json --stages ingest merge kpi
+"""
+import argparse
+import json
+import platform
+import time
+
+import numpy as np
+import pandas as pd
+
+from charts import clear_chart_cache, status_chart_png, trend_chart_png
+from exports import excel_bytes
+from kpi_cube import KpiCube
+from map_layers import map_html, site_map
+from sheet_schema import FORM_SHEET, TRACKING_SHEET
+from site_reconcile import reconcile_sites
+from synthetic_sheets import sheet_csvs
+
+STAGES = ("ingest", "merge", "kpi", "map", "charts", "excel")
+
+
+def ingest(sites_csv, form_csv):
+    return [TRACKING_SHEET.read(sites_csv), FORM_SHEET.read(form_csv)]
+
+
+def merge(sites, form):
+    df = reconcile_sites(sites, form)
+    return df.dropna(subset=["Latitude", "Longitude"])
+
+
+def kpis(df):
+    cube = KpiCube(df)
+    return cube.kpis(), cube.status_counts(), cube.daily_installs()
+
+
+def render_charts(cube_outputs):
+    clear_chart_cache()
+    _, status_counts, trend = cube_outputs
+    return status_chart_png(status_counts), trend_chart_png(trend)
+
+
+def timed(func, repeat, *args):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4), result
+
+
+def run_size(n_sites, stages, repeat, seed):
+    sites_csv, form_csv = sheet_csvs(n_sites, seed)
+    row = {"sites": n_sites, "input_bytes": len(sites_csv) + len(form_csv), "stages": {}}
+    # Later stages need the earlier results, so those always run (untimed if not selected).
+    seconds, (sites, form) = timed(ingest, repeat if "ingest" in stages else 1, sites_csv, form_csv)
+    if "ingest" in stages:
+        row["stages"]["ingest"] = {"seconds": seconds, "rows": len(sites) + len(form)}
+    seconds, df = timed(merge, repeat if "merge" in stages else 1, sites, form)
+    if "merge" in stages:
+        row["stages"]["merge"] = {"seconds": seconds, "rows": len(df)}
+    seconds, cube_outputs = timed(kpis, repeat if "kpi" in stages or "charts" in stages else 1, df)
+    if "kpi" in stages:
+        row["stages"]["kpi"] = {"seconds": seconds, "installed": cube_outputs[0].installed_count}
+    if "map" in stages:
+        seconds, html = timed(lambda: map_html(site_map(df)), repeat)
+        row["stages"]["map"] = {"seconds": seconds, "bytes": len(html.encode())}
+    if "charts" in stages:
+        seconds, pngs = timed(render_charts, repeat, cube_outputs)
+        row["stages"]["charts"] = {"seconds": seconds, "bytes": sum(len(png) for png in pngs)}
+    if "excel" in stages:
+        seconds, workbook = timed(excel_bytes, repeat, df)
+        row["stages"]["excel"] = {"seconds": seconds, "bytes": len(workbook)}
+    row["total_seconds"] = round(sum(stage["seconds"] for stage in row["stages"].values()), 4)
+    return row
+
+
+def compare(row, baseline):
+    """Per-stage ``baseline / current`` seconds (above 1 means faster now)."""
+    previous = next((r for r in baseline["results"] if r["sites"] == row["sites"]), None)
+    if previous is None:
+        return None
+    return {name: round(previous["stages"][name]["seconds"] / max(stage["seconds"], 1e-9), 2)
+            for name, stage in row["stages"].items() if name in previous["stages"]}
+
+
+def environment():
+    return {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "machine": platform.machine(), "processor": platform.processor() or platform.machine()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write all results as one JSON document to this file")
+    parser.add_argument("--baseline", help="JSON document from an earlier --output run to compare against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = []
+    for n in args.sizes:
+        row = run_size(n, args.stages, args.repeat, args.seed)
+        if baseline is not None:
+            row["speedup_vs_baseline"] = compare(row, baseline)
+        results.append(row)
+        print(json.dumps(row), flush=True)
+
+    if args.output:
+        document = {"environment": environment(), "seed": args.seed, "repeat": args.repeat, "results": results}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark: left merge + per-row apply vs ``reconcile_sites``.
+
+Times building the site table from a sites sheet and a form sheet with several
+submissions per site, and reports the resulting row counts (the merge fans out
+to one row per submission).
+
+    python bench_reconcile.py --sites 20000 --submissions 100000
+"""
+import argparse
+import json
+import time
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from site_reconcile import reconcile_sites
+
+
+def make_sheets(n_sites, n_submissions, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"ODC{i:06d}" for i in range(n_sites)])
+    sites = pd.DataFrame({
+        "Site ID": ids,
+        "Region": rng.choice(["Central", "Eastern", "Western", "Northern", "Southern"], n_sites),
+        "Latitude": np.where(rng.random(n_sites) < 0.8, rng.uniform(16.5, 31.5, n_sites), np.nan),
+        "Longitude": rng.uniform(36.5, 55.5, n_sites),
+    })
+    # Submissions cover ~60% of the sites, several times each.
+    submitted = rng.choice(ids[: int(n_sites * 0.6)], n_submissions)
+    times = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 120 * 86400, n_submissions), unit="s")
+    form = pd.DataFrame({
+        "Site ID": submitted,
+        "Latitude": rng.uniform(16.5, 31.5, n_submissions),
+        "Longitude": rng.uniform(36.5, 55.5, n_submissions),
+        "Timestamp": times.strftime("%m/%d/%Y %H:%M:%S"),
+    })
+    return sites, form
+
+
+def legacy_merge(sites, form):
+    df = sites.merge(form[["Site ID", "Latitude", "Longitude", "Timestamp"]], on="Site ID", how="left",
+                     suffixes=("", "_form"))
+    df["Status"] = df["Timestamp"].apply(lambda x: "Installed" if pd.notnull(x) else "Open")
+    df["Latitude"] = df["Latitude"].fillna(df["Latitude_form"])
+    df["Longitude"] = df["Longitude"].fillna(df["Longitude_form"])
+    df["Installation Date"] = pd.to_datetime(df["Timestamp"], errors="coerce")
+    return df
+
+
+def legacy_membership(sites, form):
+    df = sites.copy()
+    df["Status"] = df["Site ID"].apply(lambda x: "Installed" if x in form["Site ID"].values else "Open")
+    return df
+
+
+def measure(build, sites, form):
+    start = time.perf_counter()
+    df = build(sites, form)
+    return {"seconds": round(time.perf_counter() - start, 3), "rows": len(df),
+            "installed": int((df["Status"] == "Installed").sum())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", type=int, default=20000)
+    parser.add_argument("--submissions", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--membership-max-sites", type=int, default=5000,
+                        help="only time the O(sites x submissions) membership apply up to this many sites")
+    args = parser.parse_args()
+
+    for n in args.submissions:
+        sites, form = make_sheets(args.sites, n)
+        row = {"sites": args.sites, "submissions": n,
+               "merge_apply": measure(legacy_merge, sites, form),
+               "reconcile": measure(reconcile_sites, sites, form),
+               "reconcile_by_time": measure(partial(reconcile_sites, order_by_time=True), sites, form)}
+        if args.sites <= args.membership_max_sites:
+            row["membership_apply"] = measure(legacy_membership, sites, form)
+        row["speedup"] = round(row["merge_apply"]["seconds"] / max(row["reconcile"]["seconds"], 1e-9), 1)
+        print(json.dumps(row), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Status and trend charts rendered to PNG without pyplot.
+
+``plt.subplots()`` registers every figure in pyplot's global figure manager, and
+the dashboards never close them, so each 30s autorefresh leaked two figures per
+viewer. Here each chart is drawn on a standalone ``matplotlib.figure.Figure``
+that is dropped as soon as its PNG is written, and the PNG bytes are memoized
+on the chart type plus the aggregated series, so unchanged data costs a dict
+lookup instead of an Agg rasterization.
+"""
+from io import BytesIO
+
+from perf_spans import span
+from render_cache import RenderCache
+
+DPI = 200
+FIGSIZE = (6.4, 4.8)
+
+# Lower-cased Status value -> colour, matching the map markers.
+STATUS_COLORS = {"installed": "green", "open": "red"}
+OTHER_COLOR = "gray"
+
+_chart_cache = RenderCache(max_bytes=16 * 1024 * 1024)
+
+
+def _series_items(series):
+    return tuple((str(k), float(v)) for k, v in series.items())
+
+
+def _png(draw):
+    # Imported on first render: a page whose charts are all cached never loads matplotlib.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    with span("chart.render") as timing:
+        fig = Figure(figsize=FIGSIZE)
+        FigureCanvasAgg(fig)
+        draw(fig.add_subplot())
+        buffer = BytesIO()
+        fig.savefig(buffer, format="png", dpi=DPI, bbox_inches="tight")
+        timing.nbytes = buffer.tell()
+    return buffer.getvalue()
+
+
+def status_chart_png(status_counts, chart_type="Pie"):
+    """Pie or bar chart of site counts per Status."""
+    # value_counts() on a categorical Status also lists the unobserved labels.
+    items = _series_items(status_counts[status_counts > 0])
+
+    def draw(ax):
+        labels = [label for label, _ in items]
+        values = [value for _, value in items]
+        colors = [STATUS_COLORS.get(label.lower(), OTHER_COLOR) for label in labels]
+        if chart_type == "Pie":
+            ax.pie(values, labels=labels, autopct="%1.1f%%", colors=colors)
+        else:
+            ax.bar(labels, values, color=colors)
+            ax.set_ylabel("Site Count")
+
+    return _chart_cache.get_or_render(("status", chart_type, items), lambda: _png(draw))
+
+
+def trend_chart_png(trend, ylabel="Installed Sites", xlabel="Date", kind="line", marker=None, title=None):
+    """Installed sites per day as a line or bar chart."""
+    items = _series_items(trend)
+    key = ("trend", kind, marker, ylabel, xlabel, title, items)
+
+    def draw(ax):
+        if kind == "bar":
+            ax.bar([label for label, _ in items], [value for _, value in items])
+            ax.tick_params(axis="x", labelrotation=90)
+        else:
+            ax.plot(list(trend.index), list(trend.values), marker=marker)
+            ax.figure.autofmt_xdate()
+        ax.set_ylabel(ylabel)
+        ax.set_xlabel(xlabel)
+        if title:
+            ax.set_title(title)
+
+    return _chart_cache.get_or_render(key, lambda: _png(draw))
+
+
+def chart_cache_stats():
+    return _chart_cache.stats()
+
+
+def clear_chart_cache():
+    _chart_cache.clear()
@@ -0,0 +1,43 @@
+"""Check: schema-driven sheet parsing agrees with the old pandas behaviour.
+
+    python check_sheet_schema.py
+"""
+import pandas as pd
+
+from sheet_schema import FORM_SHEET, TRACKING_SHEET, parse_dates
+
+
+def check_dates():
+    # A day-first sheet is read day-first throughout, never half month-first.
+    day_first = parse_dates(pd.Series(["13/01/2025", "05/01/2025", None]))
+    assert day_first.tolist()[:2] == [pd.Timestamp("2025-01-13"), pd.Timestamp("2025-01-05")], day_first.tolist()
+    assert day_first.isna().tolist() == [False, False, True]
+    # Ambiguous values stay month-first, as pd.to_datetime reads them.
+    assert parse_dates(pd.Series(["05/01/2025", "06/01/2025"])).tolist() == \
+        pd.to_datetime(pd.Series(["05/01/2025", "06/01/2025"])).tolist()
+    # Values the column's format does not match are coerced, like errors="coerce".
+    times = parse_dates(pd.Series(["03/01/2025 10:00:00", "N/A", "2025-03-02"]))
+    assert times.tolist()[0] == pd.Timestamp("2025-03-01 10:00:00") and times[1:].isna().all(), times.tolist()
+
+
+def check_whole_rows():
+    # The Tracking Sheet keeps every column for the exports; only schema columns are typed.
+    sites = TRACKING_SHEET.read(b"site id ,Site Name,Region,Lat,Longitude,,Site Name\n"
+                                b"riy001 ,Olaya,Central,24.7,N/A,,Olaya 2\n")
+    assert sites.columns.tolist() == ["Site ID", "Site Name", "Region", "Latitude", "Longitude", "Unnamed: 5",
+                                      "Site Name.1"], sites.columns.tolist()
+    assert sites.iloc[0]["Site ID"] == "RIY001" and sites.iloc[0]["Site Name"] == "Olaya"
+    assert sites["Longitude"].isna().all()
+    # The form sheet is pruned to the schema columns.
+    form = FORM_SHEET.read(b"Timestamp,Site ID,Photo\n03/01/2025 10:00:00,RIY001,x.jpg\n")
+    assert form.columns.tolist() == ["Timestamp", "Site ID"], form.columns.tolist()
+
+
+def main():
+    check_dates()
+    check_whole_rows()
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
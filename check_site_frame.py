@@ -0,0 +1,51 @@
+"""Check: the compact site frame keeps the columns pages rely on, even when empty.
+
+Before the first form submission arrives every site is Open and the
+Installation Date column is all NaT. ``compact_sites`` must still keep it,
+both for the pages that read it directly and for ``diff_frames``, so the KPI
+cube advanced with ``apply`` matches a cube rebuilt from the next snapshot.
+
+    python check_site_frame.py
+"""
+import pandas as pd
+
+from kpi_cube import KpiCube
+from sheet_schema import FORM_SHEET, TRACKING_SHEET
+from site_changes import diff_frames
+from site_frame import compact_sites
+from site_reconcile import reconcile_sites
+
+SITES_CSV = (b"Site ID,Site Name,Region,Latitude,Longitude,Notes\n"
+             b"RIY001,Olaya,Central,24.71,46.67,\n"
+             b"JED001,Corniche,Western,21.48,39.19,\n")
+EMPTY_FORM_CSV = b"Timestamp,Site ID,Latitude,Longitude\n"
+FORM_CSV = EMPTY_FORM_CSV + b"03/01/2025 10:00:00,riy001 ,24.71,46.67\n"
+
+
+def merged(form_csv):
+    return compact_sites(reconcile_sites(TRACKING_SHEET.read(SITES_CSV), FORM_SHEET.read(form_csv)))
+
+
+def main():
+    all_open = merged(EMPTY_FORM_CSV)
+    assert (all_open["Status"] == "Open").all()
+    missing = [col for col in ("Site ID", "Status", "Installation Date") if col not in all_open.columns]
+    assert not missing, f"all-Open frame lost {missing}"
+    assert "Notes" not in all_open.columns, "empty sheet columns should still be dropped"
+
+    installed = merged(FORM_CSV)
+    live = KpiCube(all_open).apply(diff_frames(all_open, installed, 1, 2))
+    rebuilt = KpiCube(installed)
+    assert live.kpis() == rebuilt.kpis(), (live.kpis(), rebuilt.kpis())
+    assert live.daily_installs().to_dict() == rebuilt.daily_installs().to_dict()
+    assert rebuilt.daily_installs().tolist() == [1]
+
+    # A submitted but unreadable time still marks the site Installed, just without a date.
+    unreadable = merged(EMPTY_FORM_CSV + b"garbage,JED001,21.48,39.19\n").set_index("Site ID")
+    assert unreadable.loc["JED001", "Status"] == "Installed"
+    assert pd.isna(unreadable.loc["JED001", "Installation Date"])
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
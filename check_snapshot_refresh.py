@@ -0,0 +1,141 @@
+"""Check: stale-while-revalidate serving against a sheet server that hangs or fails.
+
+Starts a local HTTP server whose answers can be switched between a normal CSV,
+a response that never arrives, and ``500``; ``/trickle.csv`` always sends its
+body one byte at a time, each within the read timeout, and the fetcher's
+overall deadline must still cut it off. While the source hangs or errors,
+``serve_snapshot`` must keep returning the last good frame immediately, the
+refresher must count the failures and back off (``next_poll_in()`` beyond the
+interval), and once the source recovers ``failures`` and ``last_error`` clear.
+
+    python check_snapshot_refresh.py
+"""
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sheet_fetch import FetchTimeout, SheetFetcher, read_sheets
+from snapshot_store import serve_snapshot, snapshot_cache
+
+INTERVAL = 0.2
+TRICKLE_DELAY = 0.1
+SITES_CSV = b"Site ID,Region,Latitude,Longitude\nRIY001,Central,24.71,46.67\nJED001,Western,21.48,39.19\n"
+
+
+def start_server(state):
+    class SwitchHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/trickle.csv":
+                self.trickle()
+                return
+            if state["mode"] == "hang":
+                # The client has given up by the time this is released; just drop the connection.
+                state["released"].wait()
+                self.close_connection = True
+                return
+            if state["mode"] == "error":
+                self.send_response(500)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(SITES_CSV)))
+            self.end_headers()
+            self.wfile.write(SITES_CSV)
+
+        def trickle(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(SITES_CSV)))
+            self.end_headers()
+            try:
+                for i in range(len(SITES_CSV)):
+                    self.wfile.write(SITES_CSV[i:i + 1])
+                    self.wfile.flush()
+                    time.sleep(TRICKLE_DELAY)
+            except OSError:
+                # The client gave up at its deadline.
+                self.close_connection = True
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SwitchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_for(condition, timeout=15, what="condition"):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, f"timed out waiting for {what}"
+        time.sleep(0.05)
+
+
+def served(name, loader, directory):
+    start = time.perf_counter()
+    frame = serve_snapshot(name, loader, directory, refresh_every=INTERVAL, first_wait=5)
+    return frame, time.perf_counter() - start
+
+
+def check_trickle(base):
+    # ~10s to send the whole body, every byte well inside the 0.5s read timeout.
+    fetcher = SheetFetcher(timeout=(0.5, 0.5), deadline=1)
+    start = time.perf_counter()
+    try:
+        fetcher.fetch(f"{base}/trickle.csv")
+    except FetchTimeout:
+        pass
+    else:
+        raise AssertionError("a trickling download finished instead of hitting the deadline")
+    seconds = time.perf_counter() - start
+    assert seconds < 2, f"the 1s deadline stopped a trickling download only after {seconds:.1f}s"
+    print(f"trickle: stopped after {seconds:.2f}s")
+
+
+def main():
+    state = {"mode": "ok", "released": threading.Event()}
+    server = start_server(state)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    url = f"{base}/sites.csv"
+    check_trickle(base)
+    fetcher = SheetFetcher(timeout=(0.5, 0.5), deadline=1)
+    name, directory = "check_refresh", tempfile.mkdtemp()
+
+    def loader():
+        return read_sheets(url, fetcher=fetcher)[0]
+
+    cache = snapshot_cache(name, loader, directory)
+    frame, _ = served(name, loader, directory)
+    assert frame is not None and len(frame) == 2, frame
+    # Pages key their caches on frame_fingerprint(); it must not rehash the frame on every rerun.
+    assert frame.attrs.get("source_fingerprint"), "served frame carries no source fingerprint"
+
+    for mode in ("hang", "error"):
+        state["mode"] = mode
+        failures = cache.failures
+        wait_for(lambda: cache.failures >= failures + 2, what=f"failed polls while the server {mode}s")
+        frame, seconds = served(name, loader, directory)
+        assert frame is not None and len(frame) == 2, "the last good snapshot must still be served"
+        assert seconds < 0.1, f"serve_snapshot waited {seconds:.2f}s on a {mode}ing source"
+        assert cache.poll_delay() > INTERVAL and cache.next_poll_in() is not None, "no backoff after failures"
+        assert cache.last_error, "the failure was not recorded"
+        print(f"{mode}: served in {seconds * 1000:.1f}ms, failures={cache.failures}, "
+              f"next poll in {cache.next_poll_in():.1f}s, last error: {cache.last_error[:60]}")
+    assert "500" in cache.last_error, cache.last_error
+
+    state["mode"] = "ok"
+    state["released"].set()
+    wait_for(lambda: cache.failures == 0, what="recovery")
+    assert cache.last_error is None and cache.poll_delay() == INTERVAL
+    print("recovered: failures=0, last_error cleared")
+    server.shutdown()
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
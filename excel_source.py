@@ -0,0 +1,176 @@
+"""Cached, streaming ingestion of the tracking workbook (.xlsx).
+
+The logo dashboard downloaded the whole ``ODC-AC Installation progress``
+workbook from GitHub with ``requests.get`` and parsed every sheet cell of it
+with ``pd.read_excel`` on every rerun, i.e. on every button click. An
+``ExcelSource`` instead:
+
+* keeps the downloaded workbook on disk under ``WORKBOOK_DIR``, named by
+  the SHA-256 of its content, so a worker that cannot reach GitHub still
+  starts from the last copy it saw;
+* revalidates the URL at most every ``ttl`` seconds, through
+  ``sheet_fetch``'s conditional fetcher (ETag / digest), and for a local
+  ``.xlsx`` path only re-reads the file when its size or mtime changes;
+* parses only the one worksheet, with openpyxl in read-only mode, which
+  streams the sheet XML row by row instead of building every cell, and
+  types only the columns of a ``sheet_schema.SheetSchema`` (the other
+  columns are kept as the cells hold them when the schema has
+  ``keep_others``, else skipped);
+* memoizes the parsed frame until the content changes, so repeated
+  ``read()`` calls hand back the same frame.
+
+    source = ExcelSource(WORKBOOK_URL, "Tracking Sheet", TRACKING_WORKBOOK)
+    df = source.read()
+"""
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from perf_spans import span
+from sheet_fetch import content_digest, shared_fetcher
+from sheet_schema import SchemaError, column_names, convert
+
+logger = logging.getLogger(__name__)
+
+WORKBOOK_DIR = os.environ.get("ODC_WORKBOOK_DIR", ".workbooks")
+# Seconds between revalidations of a remote workbook.
+WORKBOOK_TTL = float(os.environ.get("ODC_WORKBOOK_TTL", 300))
+
+
+def is_remote(location):
+    return location.startswith(("http://", "https://"))
+
+
+def _cache_prefix(location, directory):
+    key = hashlib.sha256(location.encode()).hexdigest()[:16]
+    return os.path.join(directory, key)
+
+
+def cached_workbooks(location, directory=None):
+    """Stored copies of the workbook at ``location``, newest first."""
+    paths = glob.glob(f"{_cache_prefix(location, directory or WORKBOOK_DIR)}-*.xlsx")
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+def _cached_digest(path):
+    return os.path.basename(path).rsplit("-", 1)[-1][:-len(".xlsx")]
+
+
+def store_workbook(location, content, digest=None, directory=None):
+    """Write ``content`` as the cached copy of ``location`` and drop older copies."""
+    directory = directory or WORKBOOK_DIR
+    digest = digest or content_digest(content)
+    path = f"{_cache_prefix(location, directory)}-{digest}.xlsx"
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    else:
+        os.utime(path)
+    for stale in cached_workbooks(location, directory):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
+
+
+def _cell_series(values, column):
+    """Worksheet cell values (already typed by openpyxl) converted like ``sheet_schema.convert``."""
+    series = pd.Series(values, dtype=object)
+    if column.kind == "float":
+        # Numeric cells arrive as numbers; text such as "N/A" becomes NaN.
+        return pd.to_numeric(series, errors="coerce")
+    if column.kind == "datetime":
+        return pd.to_datetime(series, errors="coerce", format="mixed")
+    # Whole numbers typed into a text column come back as floats (1001.0).
+    text = series.map(lambda v: None if v is None else str(int(v)) if isinstance(v, float) and v.is_integer()
+                      else str(v))
+    return convert(text, column)
+
+
+def read_worksheet(path, sheet, schema):
+    """The ``schema`` columns of worksheet ``sheet`` in the workbook at ``path`` (all columns with ``keep_others``)."""
+    from openpyxl import load_workbook
+
+    with span("workbook.read", nbytes=os.path.getsize(path)) as timing:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            if sheet not in workbook.sheetnames:
+                raise SchemaError(f"'{sheet}' sheet not found in the {schema.name}")
+            worksheet = workbook[sheet]
+            header = next(worksheet.iter_rows(max_row=1, values_only=True), ())
+            header = ["" if value is None else str(value) for value in header]
+            columns = schema.resolve(header)
+            positions = list(range(len(header))) if schema.keep_others else sorted(columns)
+            values = {p: [] for p in positions}
+            # Cells right of the last needed column are skipped while streaming.
+            for row in worksheet.iter_rows(min_row=2, max_col=positions[-1] + 1 if positions else 1, values_only=True):
+                if all(value is None for value in row):
+                    continue
+                for p in positions:
+                    values[p].append(row[p] if p < len(row) else None)
+        finally:
+            workbook.close()
+        names = column_names(header, columns, positions)
+        df = pd.DataFrame({name: _cell_series(values[p], columns[p]) if p in columns else pd.Series(values[p])
+                           for p, name in zip(positions, names)})
+        timing.rows = len(df)
+    return df
+
+
+class ExcelSource:
+    """One worksheet of a workbook at a URL or local path, parsed once per content."""
+
+    def __init__(self, location, sheet, schema, ttl=WORKBOOK_TTL, directory=None, fetcher=None):
+        self.location = location
+        self.sheet = sheet
+        self.schema = schema
+        self.ttl = ttl
+        self.directory = directory or WORKBOOK_DIR
+        self.fetcher = fetcher
+        self._checked_at = None
+        self._path = None
+        self._key = None
+        self._frame = None
+        self._lock = threading.Lock()
+
+    def read(self):
+        """The parsed frame; re-parsed only when the workbook content changed."""
+        with self._lock:
+            path, key = self._locate()
+            if key != self._key:
+                frame = read_worksheet(path, self.sheet, self.schema)
+                frame.attrs["source_fingerprint"] = key
+                self._frame, self._key = frame, key
+            return self._frame
+
+    def _locate(self):
+        """(path of the workbook to parse, content key)."""
+        if not is_remote(self.location):
+            stat = os.stat(self.location)
+            return self.location, f"{self.location}:{stat.st_size}:{stat.st_mtime_ns}"
+        fresh = self._checked_at is not None and time.monotonic() - self._checked_at < self.ttl
+        if fresh and self._path is not None:
+            return self._path, self._key
+        try:
+            result = (self.fetcher or shared_fetcher()).fetch(self.location)
+        except Exception as e:
+            cached = self._path or next(iter(cached_workbooks(self.location, self.directory)), None)
+            if cached is None:
+                raise
+            logger.warning("Could not download %s (%s); using the cached copy %s", self.location, e, cached)
+            self._checked_at = time.monotonic()
+            return cached, self._key or _cached_digest(cached)
+        self._checked_at = time.monotonic()
+        if self._path is None or result.changed:
+            self._path = store_workbook(self.location, result.content, result.digest, self.directory)
+        return self._path, result.digest
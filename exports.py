@@ -0,0 +1,93 @@
+"""On-demand exports of the site table (Excel workbook, HTML report).
+
+``df.to_excel(BytesIO())`` used to run on every rerun whether or not anyone
+downloaded the file, and several pages also inlined the file into a base64
+``data:`` link. ``excel_export`` / ``html_export`` instead return a
+zero-argument callable for ``st.download_button(data=...)``: Streamlit only
+calls it when the button is clicked and serves the result from its media
+endpoint, so the page itself carries just the button. The workbook is written
+row by row with openpyxl's write-only mode, and every export is cached
+server-side by (data fingerprint, filter state), so viewers asking for the
+same export share a single build.
+"""
+import threading
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from perf_spans import span
+from render_cache import RenderCache
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+HTML_MIME = "text/html"
+REPORT_COLUMNS = ["Site ID", "Status", "Installation Date"]
+EXPORT_CACHE_BYTES = 128 * 1024 * 1024
+
+
+def _cell_values(series):
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        series = series.dt.tz_localize(None)
+    elif series.dtype == np.float32:
+        # Via the shortest decimal repr, so 24.7136 is not written as 24.713600158691406.
+        series = pd.to_numeric(series.astype(str), errors="coerce")
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def excel_bytes(df, sheet_name="Sheet1"):
+    """``df`` as an .xlsx workbook, streamed through a write-only sheet."""
+    # openpyxl is only needed once someone actually downloads a workbook.
+    from openpyxl import Workbook
+
+    with span("export.xlsx", rows=len(df)) as timing:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append([str(col) for col in df.columns])
+        for row in zip(*(_cell_values(df[col]) for col in df.columns)):
+            sheet.append(row)
+        buffer = BytesIO()
+        workbook.save(buffer)
+        timing.nbytes = buffer.tell()
+    return buffer.getvalue()
+
+
+_export_cache = None
+_export_cache_lock = threading.Lock()
+
+
+def export_cache():
+    global _export_cache
+    with _export_cache_lock:
+        if _export_cache is None:
+            _export_cache = RenderCache(max_bytes=EXPORT_CACHE_BYTES)
+        return _export_cache
+
+
+def excel_export(key, frame, sheet_name="Sheet1"):
+    """Deferred download payload for ``st.download_button``.
+
+    ``frame`` is a DataFrame or a zero-argument callable returning one, so
+    lazily filtered rows are only materialized when someone downloads.
+    """
+    def build():
+        df = frame() if callable(frame) else frame
+        return excel_bytes(df, sheet_name)
+
+    return lambda: export_cache().get_or_render(("xlsx", sheet_name, key), build)
+
+
+def html_report_bytes(df, columns=REPORT_COLUMNS):
+    with span("export.html", rows=len(df)) as timing:
+        table = df[[col for col in columns if col in df.columns]].to_html(index=False)
+        report = f"<html><body>{table}</body></html>".encode()
+        timing.nbytes = len(report)
+    return report
+
+
+def html_export(key, frame, columns=REPORT_COLUMNS):
+    """Deferred HTML table report for ``st.download_button``; see ``excel_export``."""
+    def build():
+        df = frame() if callable(frame) else frame
+        return html_report_bytes(df, columns)
+
+    return lambda: export_cache().get_or_render(("html", tuple(columns), key), build)
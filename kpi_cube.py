@@ -0,0 +1,163 @@
+"""Pre-aggregated KPI cube over region x status x installation day.
+
+Built once per data snapshot. The sidebar filters (Status, Region, date range)
+then select a handful of cube cells instead of rescanning the site frame, and
+the KPI tiles, status chart and trend chart are all answered from those cells.
+Full rows are only needed for the map and the exports. When a snapshot's
+change set is known, ``apply`` moves just the changed sites between cells
+instead of rebuilding the cube.
+"""
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Stands in for a missing Region so those sites still count when no region filter is set.
+NO_REGION = "\x00"
+
+
+@dataclass(frozen=True)
+class Kpis:
+    total_sites: int
+    installed_count: int
+    open_count: int
+    progress: float
+    daily_rate: float
+
+
+class KpiCube:
+    """Site counts and first/last installation times per (Region, Status, Day) cell."""
+
+    def __init__(self, df, region_column="Region", status_column="Status", date_column="Installation Date"):
+        self._columns = (region_column, status_column, date_column)
+        keys = self._cell_rows(df)
+        cells = keys.groupby(["Region", "Status", "Day"], dropna=False, sort=False).agg(
+            Sites=("Status", "size"), First=("Date", "min"), Last=("Date", "max"))
+        self._set_cells(cells.reset_index())
+
+    def _cell_rows(self, df):
+        region_column, status_column, date_column = self._columns
+        dates = pd.to_datetime(df[date_column], errors="coerce") if date_column in df.columns else pd.Series(pd.NaT, index=df.index)
+        regions = df[region_column] if region_column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        return pd.DataFrame({
+            "Region": regions.astype(object).where(regions.notna(), NO_REGION),
+            "Status": df[status_column].astype(str),
+            "Day": dates.dt.normalize(),
+            "Date": dates,
+        })
+
+    def _set_cells(self, cells):
+        self.cells = cells
+        self._region = self.cells["Region"].to_numpy(dtype=object)
+        self._status = self.cells["Status"].to_numpy(dtype=object)
+        self._day = self.cells["Day"].to_numpy(dtype="datetime64[ns]")
+        self._sites = self.cells["Sites"].to_numpy(dtype="int64")
+        self._first = self.cells["First"].to_numpy(dtype="datetime64[ns]")
+        self._last = self.cells["Last"].to_numpy(dtype="datetime64[ns]")
+        self._installed = self._status == "Installed"
+        self._open = self._status == "Open"
+
+    def apply(self, changes):
+        """New cube with a ``site_changes.ChangeSet`` applied, touching only its rows.
+
+        Each site's old cell loses one count and its new cell gains one. First/Last
+        only widen, so after removals they are bounds rather than exact extremes.
+        """
+        if not len(changes):
+            return self
+        removed = self._cell_rows(changes.before).assign(Sites=-1, Date=pd.NaT)
+        added = self._cell_rows(changes.after).assign(Sites=1)
+        delta = pd.concat([removed, added], ignore_index=True)
+        delta = delta.assign(First=delta["Date"], Last=delta["Date"]).drop(columns="Date")
+        cells = pd.concat([self.cells, delta], ignore_index=True).groupby(
+            ["Region", "Status", "Day"], dropna=False, sort=False).agg(
+            Sites=("Sites", "sum"), First=("First", "min"), Last=("Last", "max"))
+        cube = object.__new__(KpiCube)
+        cube._columns = self._columns
+        cube._set_cells(cells[cells["Sites"] > 0].reset_index())
+        return cube
+
+    def _mask(self, statuses=None, regions=None, date_range=None):
+        mask = np.ones(len(self._sites), dtype=bool)
+        if statuses is not None:
+            mask &= np.isin(self._status, list(statuses))
+        if regions:
+            mask &= np.isin(self._region, list(regions))
+        if date_range and len(date_range) == 2:
+            start = np.datetime64(pd.to_datetime(date_range[0]).normalize(), "ns")
+            end = np.datetime64(pd.to_datetime(date_range[1]).normalize(), "ns")
+            # NaT compares False, so open sites drop out like with Series.between.
+            mask &= (self._day >= start) & (self._day <= end)
+        return mask
+
+    def select(self, statuses=None, regions=None, date_range=None):
+        """Cube cells matching the dashboard filters; ``None``/empty means "no filter"."""
+        return self.cells[self._mask(statuses, regions, date_range)]
+
+    def kpis(self, statuses=None, regions=None, date_range=None):
+        mask = self._mask(statuses, regions, date_range)
+        installed_mask = mask & self._installed
+        total = int(self._sites[mask].sum())
+        installed = int(self._sites[installed_mask].sum())
+        open_ = int(self._sites[mask & self._open].sum())
+        progress = round((installed / total) * 100, 2) if total else 0
+        first = self._first[installed_mask]
+        last = self._last[installed_mask]
+        first, last = first[~np.isnat(first)], last[~np.isnat(last)]
+        days_span = 1
+        if len(first) and len(last):
+            days_span = int((last.max() - first.min()) // np.timedelta64(1, "D")) or 1
+        daily_rate = round(installed / days_span, 2) if days_span else 0
+        return Kpis(total, installed, open_, progress, daily_rate)
+
+    def status_counts(self, statuses=None, regions=None, date_range=None):
+        cells = self.select(statuses, regions, date_range)
+        counts = cells.groupby("Status", sort=False)["Sites"].sum()
+        counts = counts[counts > 0].sort_values(ascending=False, kind="stable")
+        counts.index.name = "Status"
+        return counts.rename("count")
+
+    def daily_installs(self, statuses=None, regions=None, date_range=None):
+        """Installed sites per calendar day, indexed by ``datetime.date`` like ``groupby(dt.date)``."""
+        cells = self.select(statuses, regions, date_range)
+        cells = cells[(cells["Status"] == "Installed") & cells["Day"].notna()]
+        trend = cells.groupby("Day")["Sites"].sum().sort_index()
+        trend.index = trend.index.date
+        trend.index.name = "Installation Date"
+        return trend
+
+
+class LiveKpiCube:
+    """One KpiCube per snapshot feed, advanced with ``apply`` as versions are published.
+
+    Falls back to building a cube from the frame when the feed cannot bridge
+    the gap (first use, history trimmed, or a session still rendering an older
+    version than the cube), and when the frame repeats a Site ID: change sets
+    keep one row per site while the cube counts every row, so applying them
+    would drift from a rebuild.
+    """
+
+    def __init__(self, feed, id_column="Site ID", **columns):
+        self.feed = feed
+        self.id_column = id_column
+        self.columns = columns
+        self.version = None
+        self.cube = None
+        self._duplicates = False
+        self._lock = threading.Lock()
+
+    def get(self, df, version):
+        with self._lock:
+            if self.cube is not None and version == self.version:
+                return self.cube
+            if not version or (self.version is not None and version < self.version):
+                return KpiCube(df, **self.columns)
+            changes = self.feed.since(self.version, version) if self.cube is not None else None
+            duplicates = self.id_column in df.columns and bool(df[self.id_column].duplicated().any())
+            if duplicates or self._duplicates:
+                # Either side of the change set counted repeated IDs once per row.
+                changes = None
+            self.cube = self.cube.apply(changes) if changes is not None else KpiCube(df, **self.columns)
+            self.version, self._duplicates = version, duplicates
+            return self.cube
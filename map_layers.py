@@ -0,0 +1,177 @@
+"""Folium map layers built column-wise from the site frame.
+
+``site_layer`` replaces the per-site ``folium.CircleMarker`` loop: the filtered
+frame becomes one GeoJSON FeatureCollection, coloured by ``Status`` through a
+single style function and shown with one shared popup template, so the map is
+one Leaflet layer instead of one JS object per site. ``cluster_layer`` draws
+aggregated site buckets the same way, sized by site count and coloured by the
+installed share.
+
+folium is imported inside the functions that build layers, so a page whose map
+HTML is served from ``render_cache`` never pays for importing it.
+"""
+import math
+
+from perf_spans import span
+
+SAUDI_CENTER = [23.8859, 45.0792]
+DEFAULT_ZOOM = 6
+
+# Lower-cased Status value -> marker colour; anything else is drawn red (open).
+STATUS_COLORS = {"installed": "green", "open": "red"}
+DEFAULT_COLOR = "red"
+HIGHLIGHT_COLOR = "gold"
+
+POPUP_FIELDS = ["Site ID", "Status", "Installation Date", "Region"]
+
+
+def _text_column(series):
+    return series.astype(str).where(series.notna(), "N/A")
+
+
+def site_features(df, status_column="Status", fields=POPUP_FIELDS, color_column=None):
+    """Return a GeoJSON FeatureCollection dict for every row with coordinates."""
+    df = df.dropna(subset=["Latitude", "Longitude"])
+    fields = [col for col in fields if col in df.columns]
+    columns = {col: _text_column(df[col]).tolist() for col in fields}
+    if status_column in df.columns and status_column not in columns:
+        columns[status_column] = _text_column(df[status_column]).tolist()
+    if color_column is not None:
+        columns["_color"] = df[color_column].astype(str).tolist()
+
+    names = list(columns)
+    lons = df["Longitude"].astype(float).round(6).tolist()
+    lats = df["Latitude"].astype(float).round(6).tolist()
+    features = [
+        {
+            "type": "Feature",
+            "id": i,
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": dict(zip(names, values)),
+        }
+        for i, (lon, lat, *values) in enumerate(zip(lons, lats, *columns.values()))
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+def site_layer(df, status_column="Status", fields=POPUP_FIELDS, color_column=None, radius=6, fill_opacity=0.8,
+               name="Sites"):
+    """One GeoJson layer for all sites in ``df``.
+
+    Colours come from ``STATUS_COLORS`` keyed on ``status_column``, unless
+    ``color_column`` already holds a colour per row.
+    """
+    import folium
+
+    collection = site_features(df, status_column, fields, color_column)
+
+    def style(feature):
+        props = feature["properties"]
+        color = props.get("_color") or STATUS_COLORS.get(str(props.get(status_column, "")).lower(), DEFAULT_COLOR)
+        return {"color": color, "fillColor": color, "fillOpacity": fill_opacity, "weight": 1}
+
+    popup_fields = [col for col in fields if col in df.columns]
+    popup = folium.GeoJsonPopup(fields=popup_fields, aliases=[f"{col}:" for col in popup_fields]) if popup_fields else None
+    return folium.GeoJson(
+        collection,
+        name=name,
+        style_function=style,
+        marker=folium.CircleMarker(radius=radius, fill=True),
+        popup=popup,
+    )
+
+
+# (minimum installed share, colour), checked in order.
+INSTALLED_SHARE_COLORS = [(0.75, "green"), (0.5, "yellowgreen"), (0.25, "orange"), (0.0, "red")]
+
+
+def share_color(installed, total):
+    share = installed / total if total else 0.0
+    return next(color for threshold, color in INSTALLED_SHARE_COLORS if share >= threshold)
+
+
+def cluster_layer(clusters, name="Sites"):
+    """One GeoJson layer of site buckets with ``Latitude``/``Longitude``/``Sites``/``Installed``/``Open`` columns."""
+    import folium
+
+    sites = clusters["Sites"].astype(int).tolist()
+    installed = clusters["Installed"].astype(int).tolist()
+    open_ = clusters["Open"].astype(int).tolist()
+    lons = clusters["Longitude"].astype(float).round(6).tolist()
+    lats = clusters["Latitude"].astype(float).round(6).tolist()
+    features = [
+        {
+            "type": "Feature",
+            "id": i,
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {"Sites": n, "Installed": inst, "Open": op},
+        }
+        for i, (lon, lat, n, inst, op) in enumerate(zip(lons, lats, sites, installed, open_))
+    ]
+
+    def style(feature):
+        props = feature["properties"]
+        color = share_color(props["Installed"], props["Sites"])
+        radius = 6 + 3 * math.log10(max(props["Sites"], 1))
+        return {"color": color, "fillColor": color, "fillOpacity": 0.7, "weight": 1, "radius": round(radius, 1)}
+
+    return folium.GeoJson(
+        {"type": "FeatureCollection", "features": features},
+        name=name,
+        style_function=style,
+        marker=folium.CircleMarker(radius=6, fill=True),
+        popup=folium.GeoJsonPopup(fields=["Sites", "Installed", "Open"], aliases=["Sites:", "Installed:", "Open:"]),
+    )
+
+
+def base_map(location=None, zoom_start=DEFAULT_ZOOM):
+    import folium
+
+    return folium.Map(location=location or SAUDI_CENTER, zoom_start=zoom_start)
+
+
+def viewport_layer(sites, aggregated, name="Sites", **layer_options):
+    """FeatureGroup for ``st_folium(feature_group_to_add=...)`` from ``site_index.visible_sites`` output."""
+    import folium
+
+    group = folium.FeatureGroup(name=name)
+    if not sites.empty:
+        (cluster_layer(sites) if aggregated else site_layer(sites, **layer_options)).add_to(group)
+    return group
+
+
+def highlight_layer(df, name="Installed since last refresh", radius=11):
+    """Wide translucent rings drawn over ``site_layer`` to mark recently changed sites."""
+    return site_layer(df.assign(_highlight=HIGHLIGHT_COLOR), fields=["Site ID", "Installation Date"],
+                      color_column="_highlight", radius=radius, fill_opacity=0.35, name=name)
+
+
+def site_map(df, location=None, zoom_start=DEFAULT_ZOOM, highlight=None, **layer_options):
+    with span("map.build", rows=len(df)):
+        m = base_map(location, zoom_start)
+        if not df.empty:
+            site_layer(df, **layer_options).add_to(m)
+        if highlight is not None and not highlight.empty:
+            highlight_layer(highlight).add_to(m)
+    return m
+
+
+def legacy_marker_map(df, location=None, zoom_start=DEFAULT_ZOOM):
+    """The original per-row CircleMarker loop, kept for benchmarking against site_map()."""
+    import folium
+
+    m = folium.Map(location=location or SAUDI_CENTER, zoom_start=zoom_start)
+    for _, row in df.iterrows():
+        color = "green" if row["Status"] == "Installed" else "red"
+        popup = f"Site ID: {row['Site ID']}<br>Status: {row['Status']}<br>Date: {row.get('Installation Date', 'N/A')}<br>Region: {row.get('Region', 'N/A')}"
+        folium.CircleMarker(location=[row["Latitude"], row["Longitude"]], radius=6, popup=popup,
+                            color=color, fill=True, fill_color=color, fill_opacity=0.8).add_to(m)
+    return m
+
+
+def map_html(m):
+    with span("map.render") as timing:
+        html = m.get_root().render()
+        timing.nbytes = len(html)
+    return html
+
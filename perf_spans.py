@@ -0,0 +1,189 @@
+"""Lightweight timing spans for the dashboard pipeline.
+
+Each stage (sheet fetch, CSV parse, reconcile, map build/serialize, chart
+render, export) runs inside ``span(name)`` or a ``@timed(name)`` function. A span records its duration and,
+when the caller sets them, the row count and byte size it handled. The last
+``WINDOW`` durations per span are kept per process, so rolling p50/p90/p99 are
+available without any external service. A span costs two ``perf_counter``
+calls and one deque append under a lock, so instrumentation stays on in
+production.
+
+``snapshot()`` returns the numbers as a dict (the hidden debug panel renders
+it), ``prometheus_text()`` formats them for a node-exporter textfile collector,
+and ``dump()`` / ``dump_every()`` write both formats to ``METRICS_DIR``.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+WINDOW = 512
+METRICS_DIR = os.environ.get("ODC_METRICS_DIR", ".metrics")
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Span:
+    """Handle yielded by ``span()``; set ``rows`` / ``nbytes`` before it closes."""
+
+    __slots__ = ("rows", "nbytes")
+
+    def __init__(self, rows=None, nbytes=None):
+        self.rows = rows
+        self.nbytes = nbytes
+
+
+class SpanStats:
+    def __init__(self, window=WINDOW):
+        self.durations = deque(maxlen=window)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.rows = 0
+        self.nbytes = 0
+        self.last_rows = None
+        self.last_bytes = None
+
+    def add(self, seconds, rows, nbytes):
+        self.durations.append(seconds)
+        self.count += 1
+        self.total_seconds += seconds
+        if rows is not None:
+            self.rows += rows
+            self.last_rows = rows
+        if nbytes is not None:
+            self.nbytes += nbytes
+            self.last_bytes = nbytes
+
+    def summary(self):
+        window = sorted(self.durations)
+        quantiles = {
+            f"p{round(q * 100)}": window[min(len(window) - 1, math.ceil(q * len(window)) - 1)] if window else None
+            for q in QUANTILES
+        }
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "last_seconds": self.durations[-1] if self.durations else None,
+            "max_seconds": window[-1] if window else None,
+            **{f"{name}_seconds": value for name, value in quantiles.items()},
+            "rows_total": self.rows,
+            "bytes_total": self.nbytes,
+            "last_rows": self.last_rows,
+            "last_bytes": self.last_bytes,
+        }
+
+
+class SpanRegistry:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._stats = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._dumper = None
+
+    @contextmanager
+    def span(self, name, rows=None, nbytes=None):
+        handle = Span(rows, nbytes)
+        start = time.perf_counter()
+        try:
+            yield handle
+        finally:
+            self.record(name, time.perf_counter() - start, handle.rows, handle.nbytes)
+
+    def timed(self, name, rows=None):
+        """Decorator running the function inside ``span(name)``; ``rows(result)`` sets the row count."""
+        def decorate(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name) as timing:
+                    result = func(*args, **kwargs)
+                    if rows is not None:
+                        timing.rows = rows(result)
+                    return result
+            return wrapper
+        return decorate
+
+    def record(self, name, seconds, rows=None, nbytes=None):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = SpanStats(self.window)
+            stats.add(seconds, rows, nbytes)
+
+    def register_stats(self, name, stats):
+        """Include ``stats()`` (a dict of numbers, e.g. ``RenderCache.stats``) in every dump."""
+        with self._lock:
+            self._sources[name] = stats
+
+    def snapshot(self):
+        with self._lock:
+            spans = {name: stats.summary() for name, stats in sorted(self._stats.items())}
+            sources = dict(self._sources)
+        return {"generated_at": time.time(), "spans": spans,
+                "stats": {name: stats() for name, stats in sorted(sources.items())}}
+
+    def prometheus_text(self, snapshot=None):
+        snapshot = snapshot or self.snapshot()
+        lines = [
+            "# HELP odc_span_seconds Duration of dashboard pipeline stages (rolling window).",
+            "# TYPE odc_span_seconds summary",
+        ]
+        for name, span in snapshot["spans"].items():
+            for q in QUANTILES:
+                value = span[f"p{round(q * 100)}_seconds"]
+                if value is not None:
+                    lines.append(f'odc_span_seconds{{span="{name}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'odc_span_seconds_sum{{span="{name}"}} {span["total_seconds"]:.6f}')
+            lines.append(f'odc_span_seconds_count{{span="{name}"}} {span["count"]}')
+        lines += ["# HELP odc_span_rows_total Rows handled per stage.", "# TYPE odc_span_rows_total counter"]
+        lines += [f'odc_span_rows_total{{span="{name}"}} {span["rows_total"]}' for name, span in snapshot["spans"].items()]
+        lines += ["# HELP odc_span_bytes_total Bytes handled per stage.", "# TYPE odc_span_bytes_total counter"]
+        lines += [f'odc_span_bytes_total{{span="{name}"}} {span["bytes_total"]}' for name, span in snapshot["spans"].items()]
+        lines += ["# HELP odc_stat Registered component statistics (caches).", "# TYPE odc_stat gauge"]
+        for source, values in snapshot["stats"].items():
+            lines += [f'odc_stat{{source="{source}",stat="{key}"}} {value}'
+                      for key, value in values.items() if isinstance(value, (int, float))]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, directory=None):
+        """Write ``spans.json`` and ``spans.prom`` atomically; returns the directory."""
+        directory = directory or METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        snapshot = self.snapshot()
+        for filename, text in (("spans.json", json.dumps(snapshot, indent=1)),
+                               ("spans.prom", self.prometheus_text(snapshot))):
+            path = os.path.join(directory, filename)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        return directory
+
+    def dump_every(self, seconds, directory=None):
+        """Dump from one daemon thread every ``seconds`` (idempotent)."""
+        with self._lock:
+            if self._dumper is not None:
+                return
+            self._dumper = threading.Thread(target=self._dump_loop, args=(seconds, directory),
+                                            name="span-dumper", daemon=True)
+            self._dumper.start()
+
+    def _dump_loop(self, seconds, directory):
+        while True:
+            time.sleep(seconds)
+            try:
+                self.dump(directory)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+registry = SpanRegistry()
+span = registry.span
+timed = registry.timed
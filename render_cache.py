@@ -0,0 +1,119 @@
+"""Byte-budgeted LRU cache for rendered documents such as the map HTML.
+
+``folium_static`` rebuilds and reserializes the whole Leaflet document on every
+rerun. Dashboards key the rendered HTML on (data fingerprint, filter state, map
+options) instead, so a rerun with nothing changed reuses the stored string and
+skips both map construction and serialization. Entries are evicted least
+recently used first once ``max_bytes`` is exceeded; hit/miss counters are
+available from ``stats()``.
+"""
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_freeze(v) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    return value
+
+
+def cache_key(fingerprint, filters=None, **options):
+    """Hashable key from a data fingerprint, a filter dict and render options."""
+    return (fingerprint, _freeze(filters or {}), _freeze(options))
+
+
+class RenderCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(value):
+        return len(value.encode()) if isinstance(value, str) else len(value)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self._size(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._size(self._entries.pop(key))
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+                self.evictions += 1
+        return value
+
+    def get_or_render(self, key, render):
+        """Cached value for ``key``, calling ``render()`` only on a miss.
+
+        Concurrent misses on the same key wait for the first caller's render
+        instead of repeating it.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._pending.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                value = self._entries.get(key)
+            if value is None:
+                try:
+                    value = self.put(key, render())
+                finally:
+                    with self._lock:
+                        self._pending.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_map_cache = None
+_map_cache_lock = threading.Lock()
+
+
+def map_html_cache():
+    """Process-wide cache shared by every session rendering a map."""
+    global _map_cache
+    with _map_cache_lock:
+        if _map_cache is None:
+            _map_cache = RenderCache()
+        return _map_cache
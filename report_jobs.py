@@ -0,0 +1,122 @@
+"""PDF installation reports rendered in a background process pool.
+
+``pisa.CreatePDF`` is CPU-heavy and holds the GIL, so running it inside the
+script run blocked every rerun even when nobody wanted a PDF. The page now
+only collects the report inputs (KPI summary, per-region table, trend chart
+PNG) and submits them here; the PDF is rendered in a separate process, cached
+per data snapshot, and the page shows the job status until the download is
+ready. xhtml2pdf is imported inside the worker only.
+"""
+import base64
+import html
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+MAX_WORKERS = 2
+MAX_JOBS = 8
+
+
+@dataclass(frozen=True)
+class ReportInput:
+    title: str
+    summary: tuple
+    regions: tuple
+    region_columns: tuple
+    trend_png: bytes = b""
+
+
+def region_table(df, region_column="Region", status_column="Status"):
+    """Per-region rows of (Region, Sites, Installed, Open, Progress %)."""
+    if region_column not in df.columns:
+        return ()
+    installed = df[status_column].astype(str).str.lower().eq("installed")
+    grouped = installed.groupby(df[region_column].astype(object).fillna("N/A")).agg(["size", "sum"])
+    return tuple(
+        (str(region), int(sites), int(done), int(sites - done), round(done / sites * 100, 2) if sites else 0)
+        for region, (sites, done) in grouped.iterrows()
+    )
+
+
+def report_html(report):
+    summary = "".join(f"<tr><th>{html.escape(str(k))}</th><td>{html.escape(str(v))}</td></tr>" for k, v in report.summary)
+    header = "".join(f"<th>{html.escape(col)}</th>" for col in report.region_columns)
+    rows = "".join("<tr>" + "".join(f"<td>{html.escape(str(v))}</td>" for v in row) + "</tr>" for row in report.regions)
+    chart = ""
+    if report.trend_png:
+        chart = f'<h2>Installation Trend</h2><img src="data:image/png;base64,{base64.b64encode(report.trend_png).decode()}" width="480"/>'
+    return (
+        "<html><head><style>th,td{border:1px solid #999;padding:3px}</style></head><body>"
+        f"<h1>{html.escape(report.title)}</h1>"
+        f"<table>{summary}</table>"
+        f"<h2>Progress by Region</h2><table><tr>{header}</tr>{rows}</table>"
+        f"{chart}</body></html>"
+    )
+
+
+def render_pdf(report):
+    """Runs in a worker process."""
+    from io import BytesIO
+
+    from xhtml2pdf import pisa
+
+    pdf = BytesIO()
+    result = pisa.CreatePDF(src=report_html(report), dest=pdf)
+    if result.err:
+        raise RuntimeError(f"xhtml2pdf reported {result.err} error(s)")
+    return pdf.getvalue()
+
+
+class ReportJobs:
+    """Deduplicated PDF jobs keyed by data snapshot, oldest dropped past ``max_jobs``."""
+
+    def __init__(self, max_workers=MAX_WORKERS, max_jobs=MAX_JOBS):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn: never fork the threaded Streamlit server process.
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def submit(self, key, report):
+        """Start rendering ``report`` unless a job for ``key`` is running or finished fine."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not (job.done() and job.exception() is not None):
+                return job
+            job = self._jobs[key] = self._pool().submit(render_pdf, report)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def status(self, key):
+        """One of ``"missing"``, ``"running"``, ``"done"`` or ``"failed"``."""
+        job = self.get(key)
+        if job is None:
+            return "missing"
+        if not job.done():
+            return "running"
+        return "failed" if job.exception() is not None else "done"
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def report_jobs():
+    global _jobs
+    with _jobs_lock:
+        if _jobs is None:
+            _jobs = ReportJobs()
+        return _jobs
@@ -0,0 +1,186 @@
+"""Conditional fetching of the Google Sheets CSV exports.
+
+Every request carries the ETag / Last-Modified validators from the previous
+response, so servers that honour them answer ``304 Not Modified`` without a
+body. Servers that ignore them (Google's CSV export usually does) still send the
+full payload, and the SHA-256 digest of the raw bytes tells the caller whether
+anything actually changed. Dashboards key their parse/merge step on that digest
+and skip it when the sheets are unchanged.
+
+All fetches share one keep-alive connection pool and several sheets can be
+downloaded concurrently with ``fetch_all`` / ``read_sheets``, so a cold load
+costs roughly the slowest download rather than the sum of them. Every
+download is bounded twice: per socket operation (``DEFAULT_TIMEOUT``) and in
+total (``DEFAULT_DEADLINE``, raising ``FetchTimeout``).
+
+The URLs are plain HTTP, so a local ``http.server`` can stand in for Google
+Sheets when checking this behaviour offline.
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from perf_spans import span
+
+
+def parse_timeout(value):
+    """``"10"`` -> 10.0 for both phases, ``"5,20"`` -> (connect, read) seconds, as requests takes them."""
+    parts = tuple(float(part) for part in value.split(","))
+    if len(parts) not in (1, 2):
+        raise ValueError(f"expected one number or a connect,read pair, got {value!r}")
+    return parts[0] if len(parts) == 1 else parts
+
+
+# Seconds per socket operation, e.g. ODC_FETCH_TIMEOUT="10" or "5,20" (connect, read)
+DEFAULT_TIMEOUT = parse_timeout(os.environ.get("ODC_FETCH_TIMEOUT", "5,20"))
+# Most a whole download may take, so a server trickling bytes cannot stall a refresh.
+DEFAULT_DEADLINE = float(os.environ.get("ODC_FETCH_DEADLINE", 45))
+POOL_SIZE = 8
+CHUNK_SIZE = 64 * 1024
+
+
+class FetchTimeout(requests.Timeout):
+    """The download did not finish within the fetcher's deadline."""
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    url: str
+    content: bytes
+    digest: str
+    changed: bool
+    not_modified: bool = False
+
+
+@dataclass(frozen=True)
+class _Validators:
+    etag: str
+    last_modified: str
+    content: bytes
+    digest: str
+
+
+def content_digest(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def make_session(pool_size=POOL_SIZE):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+class SheetFetcher:
+    """Remembers the last payload per URL and revalidates it on each fetch."""
+
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT, deadline=DEFAULT_DEADLINE):
+        self.session = session or make_session()
+        self.timeout = timeout
+        self.deadline = deadline
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, url):
+        with span("sheet.fetch") as timing:
+            result = self._fetch(url)
+            timing.nbytes = 0 if result.not_modified else len(result.content)
+        return result
+
+    def _fetch(self, url):
+        with self._lock:
+            previous = self._last.get(url)
+
+        headers = {}
+        if previous is not None:
+            if previous.etag:
+                headers["If-None-Match"] = previous.etag
+            if previous.last_modified:
+                headers["If-Modified-Since"] = previous.last_modified
+
+        started = time.monotonic()
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and previous is not None:
+                return FetchResult(url, previous.content, previous.digest, changed=False, not_modified=True)
+            response.raise_for_status()
+            content = self._read_body(url, response, started)
+
+        digest = content_digest(content)
+        with self._lock:
+            self._last[url] = _Validators(
+                etag=response.headers.get("ETag", ""),
+                last_modified=response.headers.get("Last-Modified", ""),
+                content=content,
+                digest=digest,
+            )
+        changed = previous is None or previous.digest != digest
+        return FetchResult(url, content, digest, changed=changed)
+
+    def _read_body(self, url, response, started):
+        # read1 returns whatever bytes have arrived (up to CHUNK_SIZE), so the
+        # deadline is checked after every socket read even when a server
+        # trickles the body a byte at a time. urllib3 < 2 has no read1.
+        read1 = getattr(response.raw, "read1", None)
+        chunks = iter(lambda: read1(CHUNK_SIZE, decode_content=True), b"") if read1 else response.iter_content(1024)
+        body = []
+        for chunk in chunks:
+            body.append(chunk)
+            if self.deadline is not None and time.monotonic() - started > self.deadline:
+                raise FetchTimeout(f"{url} did not finish downloading within {self.deadline:g}s")
+        return b"".join(body)
+
+    def fetch_all(self, urls):
+        urls = list(urls)
+        if len(urls) <= 1:
+            return [self.fetch(url) for url in urls]
+        with ThreadPoolExecutor(max_workers=min(len(urls), POOL_SIZE)) as pool:
+            return list(pool.map(self.fetch, urls))
+
+    def forget(self, url=None):
+        with self._lock:
+            if url is None:
+                self._last.clear()
+            else:
+                self._last.pop(url, None)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_fetcher():
+    """Process-wide fetcher, so every script run reuses the same connections."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SheetFetcher()
+        return _shared
+
+
+def read_sheets(*urls, fetcher=None, schemas=None):
+    """Download all ``urls`` concurrently and parse each one as a CSV DataFrame.
+
+    With ``schemas`` (one ``sheet_schema.SheetSchema`` per URL) only the
+    schema's columns are parsed, typed and renamed; see ``SheetSchema.read``.
+    """
+    results = (fetcher or shared_fetcher()).fetch_all(urls)
+    if schemas is not None:
+        return [schema.read(result.content) for schema, result in zip(schemas, results)]
+    return [parse_csv(result.content) for result in results]
+
+
+def parse_csv(content):
+    with span("sheet.read_csv", nbytes=len(content)) as timing:
+        df = pd.read_csv(BytesIO(content))
+        timing.rows = len(df)
+    return df
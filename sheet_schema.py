@@ -0,0 +1,243 @@
+"""Declarative schemas for the Tracking Sheet and the form sheet, and typed CSV ingestion.
+
+``pd.read_csv`` used to parse every column of both sheets with type
+inference. The dashboards then stripped the headers, hunted for the Site ID
+column ("site" + "id" in the header), upper-cased the IDs and ran
+``pd.to_datetime(..., errors="coerce")`` without a format. A ``SheetSchema``
+declares the columns a dashboard actually uses: canonical name, header
+aliases, whether it is required, its type and, for timestamps, the formats to
+try. ``SheetSchema.read`` reads the header row and resolves it against the
+schema, then has pyarrow's columnar CSV reader parse only those columns as
+strings (plus, with ``keep_others``, the rest of the sheet as plain strings
+so exports still show whole rows), and converts each schema column once:
+
+* ``"id"``: normalized like ``site_reconcile.site_ids``;
+* ``"float"``: ``to_float``, so "N/A" or "24,7" become NaN;
+* ``"category"`` / ``"string"``;
+* ``"datetime"``: ``parse_dates``, which parses each distinct value once, with
+  one format for the whole column (the first of the explicit formats that
+  fits every value) and ``pyarrow.compute.strptime`` when available.
+
+Without pyarrow the same columns are read with pandas' C parser.
+"""
+import csv
+import io
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+from perf_spans import span
+from site_reconcile import site_ids
+
+# Tried in order per column; month-first before day-first, like pandas' own inference.
+DATE_FORMATS = (
+    "%m/%d/%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y",
+)
+
+# Plain decimal numbers; anything else ("N/A", "24,7") becomes NaN.
+NUMBER_PATTERN = r"^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$"
+
+
+class SchemaError(ValueError):
+    """A required column is missing from a sheet."""
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    kind: str = "string"
+    required: bool = False
+    aliases: tuple = ()
+    # Fallback match: every token appears in the lower-cased header.
+    tokens: tuple = ()
+    formats: tuple = DATE_FORMATS
+
+    def named(self, header):
+        label = header.strip().lower()
+        return label == self.name.lower() or label in (alias.lower() for alias in self.aliases)
+
+    def resembles(self, header):
+        label = header.strip().lower()
+        return bool(self.tokens) and all(token in label for token in self.tokens)
+
+
+@dataclass(frozen=True)
+class SheetSchema:
+    name: str
+    columns: tuple
+    # Also read every other column, untyped, under its stripped header (for exports of whole rows).
+    keep_others: bool = False
+
+    def resolve(self, header):
+        """``{header position: Column}`` for the columns found; raises SchemaError for missing required ones."""
+        found = {}
+        for column in self.columns:
+            # Names and aliases win over token matches; the first matching header wins.
+            free = [i for i in range(len(header)) if i not in found]
+            position = next((i for i in free if column.named(header[i])),
+                            next((i for i in free if column.resembles(header[i])), None))
+            if position is not None:
+                found[position] = column
+            elif column.required:
+                raise SchemaError(f"'{column.name}' column not found in the {self.name}")
+        return found
+
+    def read(self, content):
+        """The schema's columns of the CSV ``content``, typed and under their canonical names."""
+        with span("sheet.read_csv", nbytes=len(content)) as timing:
+            header = read_header(content)
+            columns = self.resolve(header)
+            positions = list(range(len(header))) if self.keep_others else sorted(columns)
+            raw = read_columns(content, len(header), positions)
+            names = column_names(header, columns, positions)
+            df = pd.DataFrame({name: convert(raw[i], columns[p]) if p in columns else raw[i]
+                               for i, (p, name) in enumerate(zip(positions, names))})
+            timing.rows = len(df)
+        return df
+
+
+def column_names(header, columns, positions):
+    """Names for the ``positions`` read from a sheet: canonical ones for the schema ``columns``,
+    stripped headers made unique the way pandas does it for the rest."""
+    taken = {column.name for column in columns.values()}
+    names = []
+    for p in positions:
+        if p in columns:
+            names.append(columns[p].name)
+            continue
+        base = header[p].strip() or f"Unnamed: {p}"
+        name, n = base, 0
+        while name in taken:
+            n += 1
+            name = f"{base}.{n}"
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+def read_header(content):
+    text = io.TextIOWrapper(io.BytesIO(content), encoding="utf-8-sig", newline="")
+    return next(csv.reader(text), [])
+
+
+def read_columns(content, width, positions):
+    """String Series for each header position in ``positions`` (empty cells as NaN)."""
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        df = pd.read_csv(io.BytesIO(content), usecols=positions, dtype=str)
+        return [df.iloc[:, i] for i in range(len(positions))]
+    # Positional names sidestep duplicate or blank headers.
+    names = [f"c{i}" for i in range(width)]
+    table = pa_csv.read_csv(
+        io.BytesIO(content),
+        read_options=pa_csv.ReadOptions(column_names=names, skip_rows=1),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=[names[p] for p in positions],
+            column_types={names[p]: pa.string() for p in positions},
+            strings_can_be_null=True,
+        ),
+    )
+    return [table.column(names[p]).to_pandas() for p in positions]
+
+
+def convert(series, column):
+    if column.kind == "id":
+        return site_ids(series)
+    if column.kind == "float":
+        return to_float(series)
+    if column.kind == "datetime":
+        return parse_dates(series, column.formats)
+    if column.kind == "category":
+        return series.astype("category")
+    return series
+
+
+def to_float(series):
+    """``pd.to_numeric(series, errors="coerce")`` for a string column, vectorized in Arrow when available."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return pd.to_numeric(series, errors="coerce")
+    strings = pa.array(series, type=pa.string(), from_pandas=True)
+    numeric = pc.match_substring_regex(strings, NUMBER_PATTERN)
+    values = pc.cast(pc.utf8_trim_whitespace(pc.if_else(numeric, strings, pa.scalar(None, pa.string()))), pa.float64())
+    return pd.Series(values.to_numpy(zero_copy_only=False), index=series.index, name=series.name)
+
+
+def _parse_format(values, fmt):
+    """datetime64[ns] for each string in ``values`` parsed with ``fmt``; NaT where it does not match."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return pd.to_datetime(pd.Series(values), format=fmt, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    parsed = pc.strptime(pa.array(values, type=pa.string()), format=fmt, unit="s", error_is_null=True)
+    return parsed.to_numpy(zero_copy_only=False).astype("datetime64[ns]")
+
+
+def _parse_formats(values, formats):
+    """datetime64[ns] for the distinct strings ``values`` (in order of appearance), all read with one format.
+
+    The first of ``formats`` that parses every value wins. Otherwise, like
+    pandas, the format is taken from the first value and anything it does not
+    match becomes NaT, so a column never mixes month-first and day-first
+    readings of "05/01/2025".
+    """
+    if not len(values):
+        return np.array([], dtype="datetime64[ns]")
+    for fmt in formats:
+        parsed = _parse_format(values, fmt)
+        if not np.isnat(parsed).any():
+            return parsed
+    for fmt in formats:
+        if not np.isnat(_parse_format(values[:1], fmt))[0]:
+            return _parse_format(values, fmt)
+    # The first value matches none of the formats (e.g. "Jan 5, 2025"): let pandas infer one from it.
+    return pd.to_datetime(pd.Series(values), errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+
+def parse_dates(series, formats=DATE_FORMATS):
+    """``pd.to_datetime(series, errors="coerce")`` with explicit ``formats``, parsing each distinct value once."""
+    codes, uniques = pd.factorize(series)
+    parsed = _parse_formats(np.asarray(uniques, dtype=object), formats)
+    return pd.Series(take(parsed, codes, allow_fill=True), index=series.index, name=series.name)
+
+
+SITE_ID = Column("Site ID", kind="id", required=True, tokens=("site", "id"))
+LATITUDE = Column("Latitude", kind="float", aliases=("Lat",))
+LONGITUDE = Column("Longitude", kind="float", aliases=("Lon", "Long", "Lng"))
+
+TRACKING_SHEET = SheetSchema("project sheet", (
+    SITE_ID,
+    Column("Region", kind="category"),
+    LATITUDE,
+    LONGITUDE,
+    Column("Scope Status", kind="category"),
+), keep_others=True)
+
+FORM_SHEET = SheetSchema("form sheet", (
+    SITE_ID,
+    # Kept as text: any submitted time marks the site Installed, even one that
+    # does not parse; reconcile_sites parses it for the date (see parse_times).
+    Column("Timestamp"),
+    Column("Installation Date", kind="datetime"),
+    LATITUDE,
+    LONGITUDE,
+))
+
+# The "Tracking Sheet" worksheet of the GitHub-hosted progress workbook (see excel_source).
+TRACKING_WORKBOOK = SheetSchema("tracking workbook", (
+    Column("Site Name", required=True),
+    replace(LATITUDE, required=True),
+    replace(LONGITUDE, required=True),
+), keep_others=True)
@@ -0,0 +1,113 @@
+"""Hierarchical site clusters precomputed per zoom level.
+
+Modelled on supercluster: sites are projected to Web Mercator and merged
+bottom-up, one zoom level at a time. Each level is built from the level below
+by bucketing its clusters into cells of ``radius`` screen pixels at that zoom,
+with the count-weighted centre and summed installed/open counts. A
+``ClusterTree`` is built once per data snapshot, after which
+``clusters(zoom, viewport)`` is an array lookup plus a bounds filter.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+MIN_ZOOM = 0
+MAX_ZOOM = 14
+RADIUS_PX = 60
+TILE_EXTENT = 256
+
+
+def lon_to_x(lon):
+    return np.asarray(lon, dtype="float64") / 360.0 + 0.5
+
+
+def lat_to_y(lat):
+    sin = np.sin(np.radians(np.asarray(lat, dtype="float64")))
+    y = 0.5 - 0.25 * np.log((1 + sin) / (1 - sin)) / np.pi
+    return np.clip(y, 0.0, 1.0)
+
+
+def x_to_lon(x):
+    return (np.asarray(x) - 0.5) * 360.0
+
+
+def y_to_lat(y):
+    y2 = (180.0 - np.asarray(y) * 360.0) * np.pi / 180.0
+    return 360.0 * np.arctan(np.exp(y2)) / np.pi - 90.0
+
+
+@dataclass(frozen=True)
+class _Level:
+    x: np.ndarray
+    y: np.ndarray
+    sites: np.ndarray
+    installed: np.ndarray
+
+
+class ClusterTree:
+    """Cluster levels ``min_zoom..max_zoom`` plus the raw sites at ``max_zoom + 1``."""
+
+    def __init__(self, df, status_column="Status", min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius=RADIUS_PX,
+                 extent=TILE_EXTENT):
+        self.min_zoom, self.max_zoom = min_zoom, max_zoom
+        lat = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype="float64")
+        lon = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype="float64")
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        installed = df[status_column].astype(str).str.lower().eq("installed").to_numpy()[valid]
+
+        level = _Level(lon_to_x(lon[valid]), lat_to_y(lat[valid]),
+                       np.ones(int(valid.sum()), dtype="int64"), installed.astype("int64"))
+        self._levels = {max_zoom + 1: level}
+        # zoom -> index of each cluster's parent at zoom - 1
+        self._parents = {}
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            self._parents[zoom + 1], level = self._merge(level, radius / (extent * 2 ** zoom))
+            self._levels[zoom] = level
+
+    @staticmethod
+    def _merge(level, cell):
+        if len(level.x) == 0:
+            return np.empty(0, dtype="int64"), level
+        cols = np.floor(level.x / cell).astype("int64")
+        rows = np.floor(level.y / cell).astype("int64")
+        keys = rows * (int(1 / cell) + 2) + cols
+        _, parent = np.unique(keys, return_inverse=True)
+        sites = np.bincount(parent, weights=level.sites).astype("int64")
+        x = np.bincount(parent, weights=level.x * level.sites) / sites
+        y = np.bincount(parent, weights=level.y * level.sites) / sites
+        installed = np.bincount(parent, weights=level.installed).astype("int64")
+        return parent, _Level(x, y, sites, installed)
+
+    def level_for(self, zoom):
+        return int(min(max(round(zoom if zoom is not None else self.min_zoom), self.min_zoom), self.max_zoom + 1))
+
+    def clusters(self, zoom, viewport=None):
+        """Clusters at ``zoom`` as a frame of Latitude/Longitude/Sites/Installed/Open."""
+        level = self._levels[self.level_for(zoom)]
+        lat, lon = y_to_lat(level.y), x_to_lon(level.x)
+        keep = np.ones(len(lat), dtype=bool)
+        if viewport is not None:
+            keep = (lat >= viewport.south) & (lat <= viewport.north) & (lon >= viewport.west) & (lon <= viewport.east)
+        sites = level.sites[keep]
+        installed = level.installed[keep]
+        return pd.DataFrame({
+            "Latitude": lat[keep],
+            "Longitude": lon[keep],
+            "Sites": sites,
+            "Installed": installed,
+            "Open": sites - installed,
+        })
+
+    def children(self, zoom, cluster):
+        """Indices of the clusters at ``zoom + 1`` that make up ``cluster`` at ``zoom``.
+
+        Raw sites (the finest level) have no children, so that is an empty array.
+        """
+        parents = self._parents.get(self.level_for(zoom) + 1)
+        if parents is None:
+            return np.empty(0, dtype="int64")
+        return np.flatnonzero(parents == cluster)
+
+    def size(self, zoom):
+        return len(self._levels[self.level_for(zoom)].x)
@@ -0,0 +1,106 @@
+"""Index-backed Status / Region / date-range filtering of the site frame.
+
+``SiteFilterIndex`` is built once per data snapshot. It keeps one boolean mask
+per Status and Region value and the row positions sorted by installation date.
+A filter combination then becomes a single row-position array: masks are ORed
+within a dimension and ANDed across dimensions, and the date range is two
+``searchsorted`` calls. The filtered frame is materialized only when
+``Selection.frame`` is first read, e.g. by the map or the exports.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+_ONE_DAY = np.timedelta64(1, "D")
+
+
+def _value_masks(series):
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return {value: codes == code for code, value in enumerate(uniques)}
+
+
+class Selection:
+    """Row positions for one filter combination, with the rows built on first use."""
+
+    def __init__(self, df, positions):
+        self._df = df
+        self.positions = positions
+        self._frame = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            self._frame = self._df.iloc[self.positions]
+        return self._frame
+
+
+class SiteFilterIndex:
+    """Per-value masks and a date-sorted position index over one site frame."""
+
+    def __init__(self, df, status_column="Status", region_column="Region", date_column="Installation Date",
+                 max_cached=16):
+        self._df = df
+        self._size = len(df)
+        self._status = _value_masks(df[status_column]) if status_column in df.columns else {}
+        self._region = _value_masks(df[region_column]) if region_column in df.columns else {}
+        if date_column in df.columns:
+            dates = pd.to_datetime(df[date_column], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        else:
+            dates = np.full(self._size, np.datetime64("NaT"), dtype="datetime64[ns]")
+        dated = np.flatnonzero(~np.isnat(dates))
+        order = np.argsort(dates[dated], kind="stable")
+        self._date_positions = dated[order]
+        self._sorted_dates = dates[dated][order]
+        self._cache = OrderedDict()
+        self._max_cached = max_cached
+        # The index is shared by every session thread through st.cache_resource.
+        self._lock = threading.Lock()
+
+    def _any_of(self, masks, values):
+        mask = np.zeros(self._size, dtype=bool)
+        for value in values:
+            if value in masks:
+                mask |= masks[value]
+        return mask
+
+    def positions(self, statuses=None, regions=None, date_range=None):
+        """Sorted row positions; ``None``/empty regions or date range mean "no filter"."""
+        mask = np.ones(self._size, dtype=bool)
+        if statuses is not None:
+            mask &= self._any_of(self._status, statuses)
+        if regions:
+            mask &= self._any_of(self._region, regions)
+        if date_range and len(date_range) == 2:
+            start = np.datetime64(pd.to_datetime(date_range[0]).normalize(), "ns")
+            end = np.datetime64(pd.to_datetime(date_range[1]).normalize(), "ns") + _ONE_DAY
+            lo = np.searchsorted(self._sorted_dates, start, side="left")
+            hi = np.searchsorted(self._sorted_dates, end, side="left")
+            in_range = np.zeros(self._size, dtype=bool)
+            in_range[self._date_positions[lo:hi]] = True
+            mask &= in_range
+        return np.flatnonzero(mask)
+
+    def select(self, statuses=None, regions=None, date_range=None):
+        key = (
+            None if statuses is None else tuple(statuses),
+            tuple(regions or ()),
+            tuple(pd.to_datetime(d).normalize() for d in date_range) if date_range and len(date_range) == 2 else (),
+        )
+        with self._lock:
+            selection = self._cache.get(key)
+            if selection is not None:
+                self._cache.move_to_end(key)
+                return selection
+        selection = Selection(self._df, self.positions(statuses, regions, date_range))
+        with self._lock:
+            # Another session may have built the same selection meanwhile; keep the first one.
+            selection = self._cache.setdefault(key, selection)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_cached:
+                self._cache.popitem(last=False)
+        return selection
@@ -0,0 +1,68 @@
+"""Compact, shared representation of the merged site table.
+
+``load_data()`` used to return the merged frame with every label column as
+Python ``object`` strings and coordinates as float64, and ``st.cache_data``
+unpickled a fresh copy of it on every call, i.e. on every rerun of every
+session. ``compact_sites`` converts the frame once, when it is built:
+low-cardinality label columns (Status, Region, Scope Status) become
+categoricals, coordinates float32, ``Site ID`` and the other text columns
+Arrow-backed strings (one buffer instead of a Python object per cell), and
+empty or ``Unnamed:`` sheet columns are dropped (``keep`` prunes further).
+Columns the pages read or ``reconcile_sites`` derives (``PAGE_COLUMNS``) are
+kept even when empty, e.g. Installation Date before the first submission.
+
+Read-only shared mode: loaders decorated with ``st.cache_resource`` instead of
+``st.cache_data`` hand every caller the same compact frame, and
+``snapshot_store.serve_snapshot`` gives each session a shallow view of it.
+Pages only ever add or replace whole columns on that view, which never writes
+into the shared arrays, so no per-rerun deep copy is needed.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = ("Status", "Region", "Scope Status")
+COORD_COLUMNS = ("Latitude", "Longitude")
+PAGE_COLUMNS = ("Site ID", "Status", "Installation Date", "Timestamp", *CATEGORY_COLUMNS, *COORD_COLUMNS)
+
+
+def _arrow_strings(series):
+    """Object column of Python ``str`` as an Arrow-backed string column (else unchanged)."""
+    if series.dtype != object or pd.api.types.infer_dtype(series, skipna=True) != "string":
+        return series
+    try:
+        return series.astype(pd.StringDtype("pyarrow"))
+    except ImportError:
+        return series
+
+
+def compact_sites(df, keep=None, categories=CATEGORY_COLUMNS, coord_columns=COORD_COLUMNS, always=PAGE_COLUMNS):
+    """``df`` with compact dtypes and unused columns dropped; ``attrs`` are kept.
+
+    ``keep`` lists the columns the page uses (in that order); by default every
+    column that holds at least one value is kept, since the exports show whole
+    rows, and so is every column in ``always``.
+    """
+    if keep is not None:
+        out = df[[col for col in keep if col in df.columns]]
+    else:
+        unused = [col for col in df.columns if str(col).startswith("Unnamed:")
+                  or (col not in always and df[col].isna().all())]
+        out = df.drop(columns=unused)
+    converted = {}
+    for column in categories:
+        if column in out.columns and not isinstance(out[column].dtype, pd.CategoricalDtype):
+            converted[column] = out[column].astype("category")
+    for column in coord_columns:
+        if column in out.columns:
+            converted[column] = pd.to_numeric(out[column], errors="coerce").astype(np.float32)
+    for column in out.columns:
+        if column not in converted:
+            converted[column] = _arrow_strings(out[column])
+    out = out.assign(**converted)
+    out.attrs = dict(df.attrs)
+    return out
+
+
+def frame_bytes(df):
+    """Resident size of ``df`` including the string payloads."""
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,145 @@
+"""Grid index over site coordinates for viewport-limited map rendering.
+
+``SiteGridIndex`` is built once per data snapshot: sites are bucketed into
+fixed-size lat/lon cells and sorted by cell key, so a viewport query is a few
+``searchsorted`` calls per cell row plus an exact bounds check. ``visible_sites``
+uses it to return only the sites inside the current map bounds (plus a margin),
+and aggregates them into a coarse grid when more than ``MAX_VISIBLE_SITES``
+would be drawn, or takes the precomputed clusters for the current zoom when a
+``site_clusters.ClusterTree`` is supplied.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CELL_DEG = 0.25
+VIEWPORT_MARGIN = 0.25
+MAX_VISIBLE_SITES = 2000
+
+
+@dataclass(frozen=True)
+class Viewport:
+    south: float
+    west: float
+    north: float
+    east: float
+    zoom: int = None
+
+    @classmethod
+    def from_st_folium(cls, value):
+        """Viewport from the dict returned by ``st_folium``, or None before the first interaction."""
+        bounds = (value or {}).get("bounds") or {}
+        south_west, north_east = bounds.get("_southWest") or {}, bounds.get("_northEast") or {}
+        if south_west.get("lat") is None or north_east.get("lat") is None:
+            return None
+        return cls(south_west["lat"], south_west["lng"], north_east["lat"], north_east["lng"], value.get("zoom"))
+
+    def padded(self, margin=VIEWPORT_MARGIN):
+        dlat = (self.north - self.south) * margin
+        dlon = (self.east - self.west) * margin
+        return Viewport(self.south - dlat, self.west - dlon, self.north + dlat, self.east + dlon, self.zoom)
+
+    @property
+    def center(self):
+        return ((self.south + self.north) / 2, (self.west + self.east) / 2)
+
+
+class SiteGridIndex:
+    """Row positions of ``df`` bucketed by coordinate cell."""
+
+    def __init__(self, df, cell_deg=DEFAULT_CELL_DEG):
+        lat = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype="float64")
+        lon = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype="float64")
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        positions = np.flatnonzero(valid)
+        lat, lon = lat[valid], lon[valid]
+
+        self.cell_deg = cell_deg
+        self.size = len(df)
+        if len(positions) == 0:
+            self.lat0 = self.lon0 = 0.0
+            self.ncols = self.nrows = 1
+        else:
+            self.lat0, self.lon0 = lat.min(), lon.min()
+            self.ncols = int((lon.max() - self.lon0) // cell_deg) + 1
+            self.nrows = int((lat.max() - self.lat0) // cell_deg) + 1
+        keys = self._row(lat) * self.ncols + self._col(lon)
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._positions = positions[order]
+        self._lat = lat[order]
+        self._lon = lon[order]
+
+    def _col(self, lon):
+        return np.clip(((np.asarray(lon) - self.lon0) // self.cell_deg).astype("int64"), 0, self.ncols - 1)
+
+    def _row(self, lat):
+        return np.clip(((np.asarray(lat) - self.lat0) // self.cell_deg).astype("int64"), 0, self.nrows - 1)
+
+    def query(self, south, west, north, east):
+        """Sorted row positions of the sites inside the given bounds."""
+        if len(self._keys) == 0:
+            return np.empty(0, dtype="int64")
+        col0, col1 = int(self._col(west)), int(self._col(east))
+        row0, row1 = int(self._row(south)), int(self._row(north))
+        row_keys = np.arange(row0, row1 + 1) * self.ncols
+        starts = np.searchsorted(self._keys, row_keys + col0, side="left")
+        stops = np.searchsorted(self._keys, row_keys + col1, side="right")
+        candidates = np.concatenate([np.arange(a, b, dtype="int64") for a, b in zip(starts, stops)])
+        lat, lon = self._lat[candidates], self._lon[candidates]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(self._positions[candidates[inside]])
+
+    def query_viewport(self, viewport):
+        return self.query(viewport.south, viewport.west, viewport.north, viewport.east)
+
+
+def aggregate_sites(df, viewport, cap=MAX_VISIBLE_SITES, status_column="Status"):
+    """Bucket ``df`` into at most ~``cap`` grid cells over ``viewport``.
+
+    Returns one row per non-empty cell with its mean position, ``Sites``,
+    ``Installed`` and ``Open`` counts.
+    """
+    side = max(int(np.sqrt(cap)), 1)
+    lat_step = max((viewport.north - viewport.south) / side, 1e-9)
+    lon_step = max((viewport.east - viewport.west) / side, 1e-9)
+    installed = df[status_column].astype(str).str.lower().eq("installed")
+    cells = pd.DataFrame({
+        "cell_row": ((df["Latitude"] - viewport.south) // lat_step).astype("int64"),
+        "cell_col": ((df["Longitude"] - viewport.west) // lon_step).astype("int64"),
+        "Latitude": df["Latitude"],
+        "Longitude": df["Longitude"],
+        "Installed": installed.astype("int64"),
+    })
+    grouped = cells.groupby(["cell_row", "cell_col"], sort=False).agg(
+        Latitude=("Latitude", "mean"),
+        Longitude=("Longitude", "mean"),
+        Sites=("Installed", "size"),
+        Installed=("Installed", "sum"),
+    )
+    grouped["Open"] = grouped["Sites"] - grouped["Installed"]
+    return grouped.reset_index(drop=True)
+
+
+def visible_sites(df, index, viewport, margin=VIEWPORT_MARGIN, cap=MAX_VISIBLE_SITES, status_column="Status",
+                  clusters=None, default_zoom=6):
+    """Sites to draw for ``viewport``: ``(frame, aggregated)``.
+
+    Without a viewport (first render) the whole frame is considered. When more
+    than ``cap`` sites fall inside, the returned frame holds the ``clusters``
+    tree's clusters for the viewport zoom (or grid aggregates from
+    ``aggregate_sites`` without a tree) and ``aggregated`` is True.
+    """
+    if viewport is None:
+        rows = df.dropna(subset=["Latitude", "Longitude"])
+        viewport = Viewport(df["Latitude"].min(), df["Longitude"].min(), df["Latitude"].max(), df["Longitude"].max())
+    else:
+        viewport = viewport.padded(margin)
+        rows = df.iloc[index.query_viewport(viewport)]
+    if len(rows) <= cap:
+        return rows, False
+    if clusters is not None:
+        zoom = viewport.zoom if viewport.zoom is not None else default_zoom
+        return clusters.clusters(zoom, viewport), True
+    return aggregate_sites(rows, viewport, cap, status_column), True
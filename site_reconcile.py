@@ -0,0 +1,96 @@
+"""Join the installation form submissions onto the sites table.
+
+The dashboards used to ``merge`` every form row onto the sites on ``Site ID``,
+so a site with several submissions appeared several times and inflated the
+totals, then derived Status with a per-row ``apply`` (one dashboard even tested
+``x in df_installed["Site ID"].values`` per site, O(sites x submissions)).
+``reconcile_sites`` instead keeps only the latest submission per Site ID (one
+``duplicated`` pass), looks every site up in a hash index of those IDs, and
+derives Status, Installation Date and coordinates column-wise, so the result
+always has exactly one row per site row.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+from perf_spans import timed
+
+COORD_COLUMNS = ("Latitude", "Longitude")
+
+
+def site_ids(series):
+    """Site IDs normalized the way every sheet is matched: stripped, upper-case strings."""
+    return series.astype(str).str.strip().str.upper()
+
+
+def parse_times(series):
+    """``series`` as datetimes: datetime columns pass through, text is read with one format per column."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    # Imported here: sheet_schema itself imports site_ids from this module.
+    from sheet_schema import parse_dates
+    return parse_dates(series.astype("string"))
+
+
+def latest_submissions(form, id_column="Site ID", time_column=None):
+    """One row per Site ID: the latest submission.
+
+    Form responses are appended in submission order, so by default the row
+    furthest down the sheet wins and nothing has to be parsed. Pass
+    ``time_column`` to order by that column instead (unparseable times sort
+    first, ties keep sheet order).
+    """
+    if time_column is not None and time_column in form.columns:
+        times = parse_times(form[time_column])
+        order = np.argsort(times.to_numpy(dtype="datetime64[ns]").view("i8"), kind="stable")
+        form = form.iloc[order]
+    return form[~form[id_column].duplicated(keep="last")]
+
+
+@timed("merge.reconcile", rows=len)
+def reconcile_sites(sites, form, time_column="Timestamp", date_column="Installation Date",
+                    status_column="Status", labels=("Installed", "Open"), id_column="Site ID",
+                    coord_columns=COORD_COLUMNS, require_time=True, order_by_time=False):
+    """``sites`` with the latest form submission per site joined on.
+
+    Adds ``status_column`` unless it is ``None`` (``labels[0]`` when the site
+    has a submission, with a non-empty ``time_column`` if ``require_time``,
+    else ``labels[1]``; whether the time parses does not matter), the
+    submission's raw ``time_column`` and ``date_column`` parsed from it (the
+    two may be the same column; ``date_column`` is all NaT when the form has
+    no ``time_column``), and numeric coordinates,
+    taken from the sites table where present and from the submission
+    otherwise. Both frames must already carry normalized ``id_column`` values
+    (see ``site_ids``). ``order_by_time`` picks the latest submission by
+    ``time_column`` rather than by sheet order; see ``latest_submissions``.
+    """
+    latest = latest_submissions(form, id_column, time_column if order_by_time else None)
+    positions = pd.Index(latest[id_column]).get_indexer(sites[id_column])
+    matched = positions >= 0
+
+    def joined(column):
+        return take(latest[column].to_numpy(), positions, allow_fill=True)
+
+    out = sites.copy()
+    for column in coord_columns:
+        values = pd.to_numeric(out[column], errors="coerce") if column in out.columns else None
+        if column in latest.columns:
+            submitted = pd.to_numeric(pd.Series(joined(column), index=out.index), errors="coerce")
+            values = submitted if values is None else values.fillna(submitted)
+        if values is not None:
+            out[column] = values
+
+    installed = matched
+    if time_column in latest.columns:
+        out[time_column] = joined(time_column)
+        out[date_column] = parse_times(out[time_column])
+        if require_time:
+            # Any submitted time counts, like the original notna() test; the
+            # parsed value is only used for the date and the ordering.
+            installed = matched & out[time_column].notna().to_numpy()
+    elif date_column not in out.columns:
+        # Pages read the date column unconditionally, as they did with .get(..., pd.Series()).
+        out[date_column] = pd.Series(pd.NaT, index=out.index, dtype="datetime64[ns]")
+    if status_column:
+        out[status_column] = np.where(installed, labels[0], labels[1])
+    return out
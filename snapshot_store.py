@@ -0,0 +1,345 @@
+"""On-disk Parquet snapshots of the merged site frame.
+
+After a worker restart ``st.cache_data`` is empty, so the first viewer would
+wait for both Google Sheets downloads plus the merge. ``serve_snapshot`` keeps
+the last merged frame on local disk (Parquet, tagged with a schema version and
+the source fingerprint). On a cold start that file is returned immediately and
+the real ``load_data()`` runs in a background thread; once it finishes, the
+fresh frame replaces the snapshot in memory and on disk. Every frame with a
+new fingerprint is published as a new ``Snapshot`` with the next ``version``,
+so sessions can tell cheaply whether there is anything new to render, and the
+``site_changes.ChangeSet`` between consecutive versions is kept in
+``SnapshotCache.changes``.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from perf_spans import span
+from site_changes import ChangeFeed, diff_frames
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = "1"
+SNAPSHOT_DIR = os.environ.get("ODC_SNAPSHOT_DIR", ".snapshots")
+# Longest wait between refresher polls while the source keeps failing.
+MAX_BACKOFF = 15 * 60
+
+_META_VERSION = b"odc.schema_version"
+_META_FINGERPRINT = b"odc.source_fingerprint"
+_META_SAVED_AT = b"odc.saved_at"
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    frame: pd.DataFrame
+    fingerprint: str
+    saved_at: float
+    version: int = 0
+
+
+def frame_fingerprint(df):
+    """Source fingerprint set by load_data() or stamped by SnapshotCache, or a hash of the frame itself."""
+    fingerprint = df.attrs.get("source_fingerprint")
+    if fingerprint:
+        return fingerprint
+    hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(",".join(map(str, df.columns)).encode() + hashed.tobytes()).hexdigest()
+
+
+def snapshot_path(name, directory=None):
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")
+    return os.path.join(directory or SNAPSHOT_DIR, f"{slug}.parquet")
+
+
+def _to_table(df):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Sheet columns mixing numbers and text are stored as nullable strings.
+        mixed = df.select_dtypes(include="object").columns
+        return pa.Table.from_pandas(df.astype({col: "string" for col in mixed}), preserve_index=False)
+
+
+def save_snapshot(name, df, fingerprint=None, directory=None):
+    path = snapshot_path(name, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = _to_table(df)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_META_VERSION] = SCHEMA_VERSION.encode()
+    metadata[_META_FINGERPRINT] = (fingerprint or frame_fingerprint(df)).encode()
+    metadata[_META_SAVED_AT] = str(time.time()).encode()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(name, directory=None):
+    """Return the stored Snapshot, or None if missing, unreadable or from another schema version."""
+    path = snapshot_path(name, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        table = pq.read_table(path)
+    except Exception:
+        logger.warning("Ignoring unreadable snapshot %s", path, exc_info=True)
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(_META_VERSION, b"").decode() != SCHEMA_VERSION:
+        return None
+    fingerprint = metadata.get(_META_FINGERPRINT, b"").decode()
+    frame = table.to_pandas()
+    frame.attrs["source_fingerprint"] = fingerprint
+    return Snapshot(frame, fingerprint, float(metadata.get(_META_SAVED_AT, b"0")))
+
+
+class SnapshotCache:
+    """Serves ``loader()`` results, falling back to the disk snapshot while warming up.
+
+    Without a refresher every ``get()`` calls ``loader()`` (which is expected
+    to do its own TTL caching). With ``start_refresher(interval)`` one daemon
+    thread polls the loader on that schedule and ``get()`` only reads the
+    published snapshot, so the fetch cost no longer grows with the number of
+    sessions. Either way concurrent refreshes are single-flight: callers that
+    arrive while a load is running wait for it instead of starting another.
+
+    The refresher serves stale-while-revalidate: ``get()`` never waits on the
+    source once any snapshot exists (the very first load waits at most
+    ``first_wait`` seconds and then returns ``None``). Failed or empty loads
+    keep the last good snapshot published, are counted in ``failures`` with
+    the message in ``last_error``, and push the next poll out exponentially
+    (``interval * 2**failures``, at most ``MAX_BACKOFF``). ``age()`` is the
+    time since the data was last confirmed current.
+    """
+
+    def __init__(self, name, loader, directory=None):
+        self.name = name
+        self.loader = loader
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._snapshot = None
+        self._started = False
+        self._warming = None
+        self._refresher = None
+        self.changes = ChangeFeed()
+        self.interval = None
+        self.first_wait = None
+        self.last_poll = None
+        self.last_success = None
+        self.failures = 0
+        self.last_error = None
+
+    @property
+    def _frame(self):
+        return self._snapshot.frame if self._snapshot is not None else None
+
+    def _publish(self, frame, fingerprint, saved_at):
+        version = self._snapshot.version + 1 if self._snapshot is not None else 1
+        self._snapshot = Snapshot(frame, fingerprint, saved_at, version)
+
+    def snapshot(self):
+        """The current published Snapshot (``None`` before the first load)."""
+        with self._lock:
+            return self._snapshot
+
+    def get(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                snapshot = load_snapshot(self.name, self.directory)
+                if snapshot is not None:
+                    self._publish(snapshot.frame, snapshot.fingerprint, snapshot.saved_at)
+                    self._start_warming()
+                    return self._frame
+            if self._refresher is not None:
+                if self._snapshot is not None:
+                    return self._frame
+                if self._warming is None or not self._warming.is_alive():
+                    if self.next_poll_in():
+                        # Still backing off after a failed first load.
+                        return None
+                    self._start_warming()
+                warming = self._warming
+            elif self._warming is not None and self._warming.is_alive():
+                return self._frame
+        if self._refresher is not None:
+            warming.join(self.first_wait)
+            return self._frame
+        return self.refresh()
+
+    def refresh(self):
+        if not self._refreshing.acquire(blocking=False):
+            # Another thread is loading; share its result.
+            with self._refreshing:
+                if self._frame is not None:
+                    return self._frame
+            self._refreshing.acquire()
+        try:
+            try:
+                with span("snapshot.load") as timing:
+                    frame = self.loader()
+                    timing.rows = len(frame) if frame is not None else 0
+            except Exception as e:
+                self._failed(f"{type(e).__name__}: {e}")
+                raise
+            self.last_poll = time.time()
+            previous = self.snapshot()
+            if previous is not None and frame is previous.frame:
+                # A shared (st.cache_resource) loader handed back the published frame.
+                self._succeeded()
+                return self._frame
+            if frame is None or frame.empty:
+                # Keep serving the last good frame rather than an empty one.
+                self._failed("the source returned no rows")
+                return self._frame if self._frame is not None else frame
+            self._succeeded()
+            fingerprint = frame_fingerprint(frame)
+            # Hashed once per load; every later frame_fingerprint() of this
+            # frame or a session's view of it is an attrs lookup.
+            frame.attrs["source_fingerprint"] = fingerprint
+            changed = previous is None or fingerprint != previous.fingerprint
+            if changed and previous is not None:
+                # Recorded before publishing, so a session that sees the new
+                # version can always find the change set leading to it.
+                self._record_changes(previous, frame)
+            with self._lock:
+                if changed:
+                    self._publish(frame, fingerprint, self.last_poll)
+            if changed:
+                try:
+                    save_snapshot(self.name, frame, fingerprint, self.directory)
+                except Exception:
+                    logger.warning("Could not write snapshot %s", self.name, exc_info=True)
+            return self._frame
+        finally:
+            self._refreshing.release()
+
+    def _failed(self, message):
+        self.last_poll = time.time()
+        self.failures += 1
+        self.last_error = message
+
+    def _succeeded(self):
+        self.last_success = self.last_poll
+        self.failures = 0
+        self.last_error = None
+
+    def age(self):
+        """Seconds since the served data was last confirmed current (``None`` before any data)."""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        return max(0.0, time.time() - (self.last_success or snapshot.saved_at))
+
+    def _record_changes(self, previous, frame):
+        try:
+            with span("snapshot.diff", rows=len(frame)):
+                self.changes.record(diff_frames(previous.frame, frame, previous.version, previous.version + 1))
+        except Exception:
+            logger.warning("Could not diff snapshots of %s", self.name, exc_info=True)
+
+    def _warm(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # Full traceback once per outage; after that one line per retry.
+            logger.warning("Background refresh of %s failed (%d in a row); serving snapshot: %s", self.name,
+                           self.failures, e, exc_info=self.failures <= 1)
+
+    def _start_warming(self):
+        """Start a background refresh unless one is running; call with ``_lock`` held."""
+        if self._warming is None or not self._warming.is_alive():
+            self._warming = threading.Thread(target=self._warm, name=f"snapshot-{self.name}", daemon=True)
+            self._warming.start()
+
+    def start_refresher(self, interval, first_wait=10):
+        """Poll ``loader()`` every ``interval`` seconds on one daemon thread (idempotent)."""
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self.interval = interval
+            self.first_wait = first_wait
+            self._refresher = threading.Thread(target=self._poll, name=f"refresher-{self.name}", daemon=True)
+            self._refresher.start()
+
+    def poll_delay(self):
+        """Current wait between polls: ``interval``, doubled per consecutive failure."""
+        if not self.failures:
+            return self.interval
+        return min(self.interval * 2 ** self.failures, max(MAX_BACKOFF, self.interval))
+
+    def _poll(self):
+        while True:
+            time.sleep(self.next_poll_in() or self.interval)
+            if self.next_poll_in():
+                # A reload or first load polled meanwhile; wait out the new schedule.
+                continue
+            self._warm()
+
+    def next_poll_in(self):
+        """Seconds until the refresher's next poll, or ``None`` without a refresher."""
+        if self.interval is None or self.last_poll is None:
+            return None
+        return max(0.0, self.last_poll + self.poll_delay() - time.time())
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def snapshot_cache(name, loader, directory=None):
+    """Process-wide SnapshotCache for ``name``.
+
+    ``loader`` replaces the cache's loader on every call, so after Streamlit
+    re-executes an edited page the next refresh runs the new ``load_data``
+    rather than the one captured by the first call.
+    """
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = SnapshotCache(name, loader, directory)
+        else:
+            cache.loader = loader
+    return cache
+
+
+def serve_snapshot(name, loader, directory=None, refresh_every=None, first_wait=10):
+    """Frame to render for ``name``.
+
+    With ``refresh_every`` (seconds) the cache is kept current by its shared
+    background refresher and this call never loads on the session's behalf
+    once a snapshot exists; before that it waits at most ``first_wait``
+    seconds and returns ``None`` if there is still no data (see
+    ``SnapshotCache``). Each caller gets its own shallow copy, so adding
+    or replacing columns in one session cannot leak into the shared snapshot;
+    its ``attrs["snapshot_version"]`` is the version it was taken from.
+    """
+    cache = snapshot_cache(name, loader, directory)
+    if refresh_every is not None:
+        cache.start_refresher(refresh_every, first_wait)
+    frame = cache.get()
+    if frame is None:
+        return frame
+    snapshot = cache.snapshot()
+    view = frame.copy(deep=False)
+    # 0 when a newer snapshot was published meanwhile, so a version watcher reruns at once.
+    view.attrs["snapshot_version"] = snapshot.version if snapshot is not None and snapshot.frame is frame else 0
+    return view
+
+
+def snapshot_version(name):
+    """Version of the snapshot currently published for ``name`` (0 if none)."""
+    with _caches_lock:
+        cache = _caches.get(name)
+    snapshot = cache.snapshot() if cache is not None else None
+    return snapshot.version if snapshot is not None else 0
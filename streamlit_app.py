@@ -1,57 +1,38 @@
 
 import streamlit as st
 import pandas as pd
-import folium
-from streamlit_folium import folium_static
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
+from sheet_fetch import read_sheets
+from sheet_schema import FORM_SHEET, TRACKING_SHEET, SchemaError
+from snapshot_store import frame_fingerprint, serve_snapshot
+from site_frame import compact_sites
+from site_reconcile import reconcile_sites
+from map_layers import map_html, site_map
+from charts import status_chart_png, trend_chart_png
+from exports import HTML_MIME, XLSX_MIME, excel_export, html_export
+from render_cache import cache_key, map_html_cache
 
 st.set_page_config(page_title="Saudi AC Installation Dashboard", layout="wide")
 st.title("📊 Saudi AC Installation Dashboard")
 
-@st.cache_data
+@st.cache_resource
 def load_data():
     project_url = "https://docs.google.com/spreadsheets/d/1pZBg_lf8HakI6o2W1v8u1lUN2FGJn1Jc/export?format=csv"
     form_url = "https://docs.google.com/spreadsheets/d/1IeZVNb01-AMRuXjj9SZQyELTVr6iw5Vq4JsiN7PdZEs/export?format=csv"
 
-    df_sites = pd.read_csv(project_url)
-    df_sites.columns = df_sites.columns.str.strip()
-
-    df_form = pd.read_csv(form_url)
-    df_form.columns = df_form.columns.str.strip()
-
-    # التعامل مع اسم العمود Site ID بمرونة
-    if not any("site" in col.lower() and "id" in col.lower() for col in df_sites.columns):
-        st.error("❌ 'Site ID' column not found in the project sheet.")
+    # الأعمدة المطلوبة فقط، بأنواعها (يشمل التعرف المرن على عمود Site ID)
+    try:
+        df_sites, df_form = read_sheets(project_url, form_url, schemas=(TRACKING_SHEET, FORM_SHEET))
+    except SchemaError as e:
+        st.error(f"❌ {e}.")
         return pd.DataFrame()
 
-    site_col = [col for col in df_sites.columns if "site" in col.lower() and "id" in col.lower()][0]
-    df_sites["Site ID"] = df_sites[site_col].astype(str).str.strip().str.upper()
-
-    df_form["Site ID"] = df_form["Site ID"].astype(str).str.strip().str.upper()
+    df_sites = reconcile_sites(df_sites, df_form)
 
-    df_form_filtered = df_form[df_form["Site ID"].isin(df_sites["Site ID"])]
-    df_sites = df_sites.merge(
-        df_form_filtered[["Site ID", "Latitude", "Longitude", "Timestamp"]],
-        on="Site ID",
-        how="left"
-    )
-
-    df_sites["Status"] = df_sites["Timestamp"].apply(lambda x: "Installed" if pd.notnull(x) else "Open")
-    if "Latitude" in df_sites.columns:
-        df_sites["Latitude"] = df_sites["Latitude"].combine_first(df_sites.get("Latitude_y"))
-    if "Longitude" in df_sites.columns:
-        df_sites["Longitude"] = df_sites["Longitude"].combine_first(df_sites.get("Longitude_y"))
-    df_sites["Installation Date"] = df_sites["Timestamp"].fillna("")
-
-    df_sites["Latitude"] = pd.to_numeric(df_sites["Latitude"], errors="coerce")
-    df_sites["Longitude"] = pd.to_numeric(df_sites["Longitude"], errors="coerce")
     df_sites.dropna(subset=["Latitude", "Longitude"], inplace=True)
 
-    return df_sites
+    return compact_sites(df_sites)
 
-df = load_data()
+df = serve_snapshot("streamlit_app", load_data)
 
 if not df.empty:
     total_sites = len(df)
@@ -73,44 +54,20 @@ if not df.empty:
     st.markdown("---")
 
     st.subheader("📍 Site Installation Map")
-    m = folium.Map(location=[23.8859, 45.0792], zoom_start=6)
-    for _, row in df.iterrows():
-        color = "green" if row["Status"] == "Installed" else "red"
-        folium.CircleMarker(
-            location=[row["Latitude"], row["Longitude"]],
-            radius=6,
-            popup=f"Site ID: {row['Site ID']}<br>Status: {row['Status']}<br>Installation Date: {row['Installation Date']}",
-            color=color,
-            fill=True,
-            fill_color=color,
-            fill_opacity=0.8,
-        ).add_to(m)
-    folium_static(m)
+    map_key = cache_key(frame_fingerprint(df), width=700, height=500)
+    map_doc = map_html_cache().get_or_render(map_key, lambda: map_html(site_map(df)))
+    st.iframe(map_doc, height=510, width=700)
 
     st.subheader("📊 Installation Status Distribution")
-    fig1, ax1 = plt.subplots()
-    df["Status"].value_counts().plot.pie(autopct="%1.1f%%", colors=["green", "red"], ax=ax1)
-    ax1.set_ylabel("")
-    st.pyplot(fig1)
+    st.image(status_chart_png(df["Status"].value_counts()), width="stretch")
 
     st.subheader("📈 Daily Installation Trend")
     trend_df = df[df["Status"] == "Installed"].copy()
     trend_df["Installation Date"] = pd.to_datetime(trend_df["Installation Date"], errors="coerce")
     trend = trend_df.groupby(trend_df["Installation Date"].dt.date).size()
-    fig2, ax2 = plt.subplots()
-    trend.plot(ax=ax2)
-    ax2.set_ylabel("Sites Installed")
-    ax2.set_xlabel("Date")
-    st.pyplot(fig2)
+    st.image(trend_chart_png(trend, ylabel="Sites Installed"), width="stretch")
 
     st.markdown("### 📥 Export Data")
-    excel_buffer = BytesIO()
-    df.to_excel(excel_buffer, index=False, engine="openpyxl")
-    excel_data = excel_buffer.getvalue()
-
-    st.download_button("⬇️ Download Excel", data=excel_data, file_name="installation_status.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    st.download_button("⬇️ Download Excel", data=excel_export(frame_fingerprint(df), df), file_name="installation_status.xlsx", mime=XLSX_MIME, on_click="ignore")
 
-    df_sample_html = df[["Site ID", "Status", "Installation Date"]].to_html(index=False)
-    pdf_html = f"<html><body>{df_sample_html}</body></html>"
-    b64 = base64.b64encode(pdf_html.encode()).decode()
-    st.markdown(f'<a href="data:text/html;base64,{b64}" download="installation_report.html">⬇️ Download PDF Report</a>', unsafe_allow_html=True)
+    st.download_button("⬇️ Download PDF Report", data=html_export(frame_fingerprint(df), df), file_name="installation_report.html", mime=HTML_MIME, on_click="ignore")
@@ -1,10 +1,11 @@
 
 import streamlit as st
-import pandas as pd
-import folium
 from streamlit_folium import st_folium
+import os
 from io import BytesIO
-import requests
+from excel_source import ExcelSource
+from sheet_schema import TRACKING_WORKBOOK, SchemaError
+from map_layers import site_map
 
 st.set_page_config(layout="wide")
 st.markdown(
@@ -30,11 +31,19 @@ st.markdown(
 
 st.markdown("**Prepared by: Mohammed Alfadhel**")
 
-# Load Excel from GitHub using requests
+# Load Excel from GitHub (or a local .xlsx path set in ODC_TRACKING_WORKBOOK)
 url = "https://raw.githubusercontent.com/mrakai123/ODC-AC-Installation-progress-/main/ODC-AC%20Installation%20progress%2002-March-25%20_.xlsx"
-response = requests.get(url)
-data = BytesIO(response.content)
-df_sites = pd.read_excel(data, sheet_name="Tracking Sheet")
+
+@st.cache_resource
+def workbook_source():
+    return ExcelSource(os.environ.get("ODC_TRACKING_WORKBOOK", url), "Tracking Sheet", TRACKING_WORKBOOK)
+
+try:
+    # Same frame until the workbook changes; the Status column below only goes on this run's copy.
+    df_sites = workbook_source().read().copy(deep=False)
+except SchemaError as e:
+    st.error(f"❌ {e}.")
+    st.stop()
 
 # Simulated Installed Site Names (to be fetched from Google Sheet in future)
 installed_sites = [
@@ -46,22 +55,8 @@ df_sites["Status"] = df_sites["Site Name"].apply(
     lambda x: "Installed" if str(x).strip() in installed_sites else "Open"
 )
 
-# Marker color function
-def get_marker_color(status):
-    return "green" if status == "Installed" else "red"
-
 # Map creation
-m = folium.Map(location=[23.8859, 45.0792], zoom_start=6)
-for i in range(len(df_sites)):
-    site_name = df_sites.loc[i, "Site Name"]
-    lat = df_sites.loc[i, "Latitude"]
-    lon = df_sites.loc[i, "Longitude"]
-    status = df_sites.loc[i, "Status"]
-    folium.Marker(
-        location=[lat, lon],
-        popup=f"{site_name} - {status}",
-        icon=folium.Icon(color=get_marker_color(status))
-    ).add_to(m)
+m = site_map(df_sites, fields=["Site Name", "Status"])
 
 # Display map in Streamlit
 st_data = st_folium(m, width=1100)
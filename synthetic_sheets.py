@@ -0,0 +1,126 @@
+"""Deterministic synthetic Tracking Sheet and form-submission sheet.
+
+Stands in for the two Google Sheets so the pipeline can be exercised offline
+at any size. The data has the quirks the real sheets have: sites clustered
+around the main cities of each region, form rows submitted several times for
+the same site, Site IDs typed with stray spaces and lower case, submissions
+for IDs that are not in the Tracking Sheet, and coordinates that are blank,
+"N/A", zero, swapped or written with a decimal comma. The same ``seed`` and
+size always give byte-identical CSVs.
+
+    from synthetic_sheets import sheet_csvs
+    sites_csv, form_csv = sheet_csvs(10_000)
+"""
+import numpy as np
+import pandas as pd
+
+# Region -> (prefix, [(lat, lon) of the cities sites cluster around])
+REGIONS = {
+    "Central": ("RIY", [(24.7136, 46.6753), (26.3260, 43.9750), (24.0760, 47.3150)]),
+    "Western": ("JED", [(21.4858, 39.1925), (21.3891, 39.8579), (24.5247, 39.5692)]),
+    "Eastern": ("DMM", [(26.4207, 50.0888), (26.2172, 50.1971), (25.3830, 49.5870)]),
+    "Northern": ("TBK", [(28.3838, 36.5550), (27.5114, 41.7208), (30.9753, 41.0381)]),
+    "Southern": ("ABH", [(18.2164, 42.5053), (16.8892, 42.5511), (17.4917, 44.1277)]),
+}
+REGION_WEIGHTS = (0.35, 0.25, 0.2, 0.1, 0.1)
+CITY_SPREAD = 0.35
+START = pd.Timestamp("2025-01-01 07:00:00")
+DAYS = 120
+
+INSTALLED_SHARE = 0.6
+BAD_COORD_SHARE = 0.05
+MESSY_ID_SHARE = 0.1
+UNKNOWN_ID_SHARE = 0.01
+
+
+def _messy_ids(ids, rng, share=MESSY_ID_SHARE):
+    """Some IDs lower-cased and/or padded with spaces, as typed into the form."""
+    ids = ids.astype(object)
+    picked = rng.random(len(ids)) < share
+    lower = picked & (rng.random(len(ids)) < 0.5)
+    ids[lower] = [value.lower() for value in ids[lower]]
+    ids[picked] = [f" {value}  " if flip else f"{value} " for value, flip in
+                   zip(ids[picked], rng.random(int(picked.sum())) < 0.5)]
+    return ids
+
+
+def _bad_coordinates(lat, lon, rng, share=BAD_COORD_SHARE):
+    """Latitude/Longitude as the text a sheet holds, with ``share`` of them broken."""
+    lat_text = np.array([f"{value:.6f}" for value in lat], dtype=object)
+    lon_text = np.array([f"{value:.6f}" for value in lon], dtype=object)
+    broken = np.flatnonzero(rng.random(len(lat)) < share)
+    kinds = rng.integers(0, 5, len(broken))
+    for position, kind in zip(broken, kinds):
+        if kind == 0:
+            lat_text[position] = lon_text[position] = ""
+        elif kind == 1:
+            lat_text[position] = "N/A"
+        elif kind == 2:
+            lat_text[position] = lon_text[position] = "0"
+        elif kind == 3:
+            lat_text[position], lon_text[position] = lon_text[position], lat_text[position]
+        else:
+            lat_text[position] = lat_text[position].replace(".", ",")
+    return lat_text, lon_text
+
+
+def tracking_sheet(n_sites, seed=0):
+    """The site master list: one row per planned site."""
+    rng = np.random.default_rng(seed)
+    names = list(REGIONS)
+    region_index = rng.choice(len(names), n_sites, p=REGION_WEIGHTS)
+    city_index = rng.integers(0, 3, n_sites)
+    centers = np.array([REGIONS[names[r]][1][c] for r, c in zip(region_index, city_index)])
+    lat = centers[:, 0] + rng.normal(0, CITY_SPREAD, n_sites)
+    lon = centers[:, 1] + rng.normal(0, CITY_SPREAD, n_sites)
+    lat_text, lon_text = _bad_coordinates(lat, lon, rng)
+    ids = np.array([f"{REGIONS[names[r]][0]}{i:06d}" for i, r in enumerate(region_index)])
+    return pd.DataFrame({
+        "Site ID": _messy_ids(ids, rng, share=MESSY_ID_SHARE / 4),
+        "Site Name": [f"Site {i}" for i in range(n_sites)],
+        "Region": np.array(names)[region_index],
+        "Latitude": lat_text,
+        "Longitude": lon_text,
+    })
+
+
+def form_sheet(tracking, seed=0):
+    """Installation form responses for ``tracking``, in submission order.
+
+    About ``INSTALLED_SHARE`` of the sites are submitted, some of them two or
+    three times (resubmissions land later), plus a few rows for unknown IDs.
+    """
+    rng = np.random.default_rng(seed + 1)
+    canonical = tracking["Site ID"].str.strip().str.upper().to_numpy()
+    installed = canonical[rng.random(len(canonical)) < INSTALLED_SHARE]
+    repeats = rng.choice([1, 2, 3], len(installed), p=[0.75, 0.18, 0.07])
+    ids = np.repeat(installed, repeats)
+    unknown = np.array([f"XXX{i:06d}" for i in range(int(len(ids) * UNKNOWN_ID_SHARE))], dtype=object)
+    ids = np.concatenate([ids, unknown])
+
+    seconds = rng.integers(0, DAYS * 86400, len(ids))
+    order = np.argsort(seconds, kind="stable")
+    ids, seconds = ids[order], seconds[order]
+    times = START + pd.to_timedelta(seconds, unit="s")
+
+    lookup = tracking.assign(_id=canonical).drop_duplicates("_id").set_index("_id")
+    known = pd.Index(lookup.index).get_indexer(ids)
+    region = np.where(known >= 0, lookup["Region"].to_numpy()[known], "Central")
+    centers = np.array([REGIONS[name][1][0] for name in region])
+    lat = centers[:, 0] + rng.normal(0, CITY_SPREAD, len(ids))
+    lon = centers[:, 1] + rng.normal(0, CITY_SPREAD, len(ids))
+    lat_text, lon_text = _bad_coordinates(lat, lon, rng)
+    return pd.DataFrame({
+        "Timestamp": times.strftime("%m/%d/%Y %H:%M:%S"),
+        "Site ID": _messy_ids(ids, rng),
+        "Latitude": lat_text,
+        "Longitude": lon_text,
+        "Count Of Installed ACs": rng.integers(1, 5, len(ids)),
+    })
+
+
+def sheet_csvs(n_sites, seed=0):
+    """(Tracking Sheet CSV bytes, form CSV bytes) as Google's CSV export would serve them."""
+    tracking = tracking_sheet(n_sites, seed)
+    form = form_sheet(tracking, seed)
+    return tracking.to_csv(index=False).encode(), form.to_csv(index=False).encode()
@@ -1,15 +1,16 @@
 
 import streamlit as st
 import pandas as pd
-import folium
 from streamlit_folium import st_folium
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
+from snapshot_store import frame_fingerprint, serve_snapshot
+from site_frame import compact_sites
+from map_layers import site_map
+from charts import trend_chart_png
+from exports import XLSX_MIME, excel_export
 
 st.set_page_config(page_title="Saudi AC Installation Dashboard", layout="wide")
 
-@st.cache_data(ttl=86400)
+@st.cache_resource(ttl=86400)
 def load_data():
     sheet_url = "https://docs.google.com/spreadsheets/d/1IeZVNb01-AMRuXjj9SZQyELTVr6iw5Vq4JsiN7PdZEs/export?format=csv&gid=1076079545"
     df = pd.read_csv(sheet_url)
@@ -30,9 +31,9 @@ def load_data():
         df["Longitude"] = pd.to_numeric(df["Longitude"], errors="coerce")
         df = df.dropna(subset=["Latitude", "Longitude"])
 
-    return df
+    return compact_sites(df)
 
-df = load_data()
+df = serve_snapshot("wiconnect_odc_ac_project", load_data)
 
 # Metrics
 total_sites = len(df)
@@ -65,19 +66,7 @@ col5.metric("Daily Rate", f"{daily_rate} sites/day")
 # Map
 st.subheader("📍 Site Installation Map")
 if "Latitude" in df.columns and "Longitude" in df.columns:
-    m = folium.Map(location=[23.8859, 45.0792], zoom_start=6)
-    for _, row in df.iterrows():
-        status = row["Scope Status"]
-        color = "green" if status == "installed" else "red"
-        folium.CircleMarker(
-            location=[row["Latitude"], row["Longitude"]],
-            radius=6,
-            color=color,
-            fill=True,
-            fill_color=color,
-            fill_opacity=0.7,
-            tooltip=row["Site ID"]
-        ).add_to(m)
+    m = site_map(df, status_column="Scope Status", fields=["Site ID", "Scope Status"], fill_opacity=0.7)
     st_folium(m, width=1000, height=500)
 else:
     st.warning("Latitude and Longitude data not found.")
@@ -86,23 +75,14 @@ else:
 st.subheader("📈 Installation Trend")
 if not installed_sites.empty:
     trend = installed_sites.groupby(installed_sites["Installation Date"].dt.date).size()
-    fig, ax = plt.subplots()
-    trend.plot(kind="line", marker="o", ax=ax)
-    ax.set_xlabel("Date")
-    ax.set_ylabel("Installed Sites")
-    ax.set_title("Daily Installation Trend")
-    st.pyplot(fig)
+    st.image(trend_chart_png(trend, marker="o", title="Daily Installation Trend"), width="stretch")
 else:
     st.info("No installation data available.")
 
 # Export Buttons
 st.subheader("📥 Export Data")
 
-excel_buffer = BytesIO()
-df.to_excel(excel_buffer, index=False)
-excel_buffer.seek(0)
-b64_excel = base64.b64encode(excel_buffer.read()).decode()
-st.download_button("📊 Download Excel", f"data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64_excel}", file_name="ac_installation_data.xlsx")
+st.download_button("📊 Download Excel", excel_export(frame_fingerprint(df), df), file_name="ac_installation_data.xlsx", mime=XLSX_MIME, on_click="ignore")
 
 pdf_placeholder = st.empty()
 st.caption("📌 PDF download feature is not supported in Streamlit Cloud directly.")